@@ -0,0 +1,5 @@
+"""Benchmarks for the api services.
+
+Run a benchmark as a module from the Django project root, e.g.:
+    python -m api.benchmarks.bench_netcdf
+"""
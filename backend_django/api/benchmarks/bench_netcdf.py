@@ -0,0 +1,101 @@
+"""Benchmark of peak memory and time of reducing a retrieved NetCDF file with
+`to_dataframe().mean()` vs lazy xarray sampling of the needed variables, on a
+synthetic ERA5-like fixture."""
+
+import argparse
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import xarray as xr
+
+from ..services.netcdf_utils import open_variables, sample_points
+
+VARIABLES = [
+    '2m_temperature',
+    '2m_dewpoint_temperature',
+    'surface_pressure',
+    'total_precipitation'
+]
+
+
+def synthetic_netcdf(path: str, times: int, size: int, extra: int, resolution: float = 0.25) -> None:
+    """
+    Write a NetCDF4 file with `times` steps on a `size` x `size` grid, holding
+    the ERA5 variables the service reads and `extra` variables it doesn't
+    """
+    rng = np.random.default_rng(0)
+    latitude = 45 - np.arange(size) * resolution
+    longitude = 15 + np.arange(size) * resolution
+    names = VARIABLES + [f'extra_{i}' for i in range(extra)]
+    data = {
+        name: (('time', 'latitude', 'longitude'), rng.random((times, size, size), dtype=np.float32))
+        for name in names
+    }
+    xr.Dataset(
+        data,
+        coords={'time': np.arange(times), 'latitude': latitude, 'longitude': longitude}
+    ).to_netcdf(path, format='NETCDF4')
+
+
+def measure(run) -> tuple:
+    """Elapsed seconds and peak traced memory in MiB of run()"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--times', type=int, default=24)
+    parser.add_argument('--size', type=int, default=200)
+    parser.add_argument('--extra', type=int, default=4)
+    parser.add_argument('--points', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'fixture.nc')
+        synthetic_netcdf(path, args.times, args.size, args.extra)
+        rng = np.random.default_rng(1)
+        span = (args.size - 1) * 0.25
+        points = list(zip(45 - rng.random(args.points) * span, 15 + rng.random(args.points) * span))
+        kept = []
+
+        def dataframe():
+            # Previous processing path
+            for _ in range(args.repeat):
+                kept.append(xr.open_dataset(path).to_dataframe().mean())
+
+        def lazy(chunk_threshold):
+            def run():
+                for _ in range(args.repeat):
+                    with open_variables(path, VARIABLES, chunk_threshold) as ds:
+                        kept.append(sample_points(ds, points))
+            return run
+
+        # Warm up, so one-off imports of the interpolation backends aren't timed
+        with open_variables(path, VARIABLES) as ds:
+            sample_points(ds.isel(time=[0]), points[:1])
+
+        print(f'fixture {os.path.getsize(path) / 2 ** 20:.1f} MiB, {len(points)} points')
+        print(f"{'mode':>10} {'peak [MiB]':>11} {'elapsed [s]':>12}")
+        for mode, run in (
+            ('dataframe', dataframe),
+            ('lazy', lazy(float('inf'))),
+            ('dask', lazy(0))
+        ):
+            elapsed, peak = measure(run)
+            print(f'{mode:>10} {peak:>11.1f} {elapsed:>12.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from backend_django.coper_api.copernicus_api import Sentinel2API
+from backend_django.coper_api.download_manager import STATES, DownloadManager
+
+
+class Command(BaseCommand):
+    help = 'Inspect and drain the persistent queue of Sentinel product downloads'
+
+    def add_arguments(self, parser):
+        subparsers = parser.add_subparsers(dest='action', required=True)
+        subparsers.add_parser('status', help='Show the number of products per state')
+
+        list_parser = subparsers.add_parser('list', help='List queued products')
+        list_parser.add_argument('--state', choices=STATES)
+
+        drain_parser = subparsers.add_parser('drain', help='Download queued products')
+        drain_parser.add_argument('--threads', type=int, default=4)
+        drain_parser.add_argument('--limit', type=int)
+        drain_parser.add_argument('--segments', type=int, default=1)
+
+        subparsers.add_parser('retry', help='Requeue failed products')
+        subparsers.add_parser('recover', help='Requeue products left in progress')
+
+    def handle(self, *args, **options):
+        # Downloads don't depend on the mission, any client will do
+        api = Sentinel2API(settings.CDSE_USERNAME, settings.CDSE_PASSWORD)
+        manager = DownloadManager(api, settings.CDSE_MANIFEST, settings.CDSE_DOWNLOAD_DIR)
+        action = options['action']
+
+        if action == 'list':
+            entries = manager.entries(options['state'])
+            columns = ['name', 'priority', 'state', 'attempts', 'bytes', 'error']
+            self.stdout.write(entries[columns].to_string(index=False))
+            return
+        if action == 'drain':
+            manager.drain(
+                threads=options['threads'],
+                limit=options['limit'],
+                segments=options['segments'],
+            )
+        elif action == 'retry':
+            self.stdout.write(f'Requeued {manager.retry_failed()} failed products')
+        elif action == 'recover':
+            self.stdout.write(f'Requeued {manager.recover()} products')
+
+        for state, count in manager.status().items():
+            self.stdout.write(f'{state:>12}: {count}')
@@ -1,13 +1,21 @@
 import cdsapi
-import xarray as xr
 import pandas as pd
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
 from datetime import datetime, timedelta
-import os
+import time
 from django.conf import settings
-import tempfile
+from .netcdf_cache import NetCDFCache
+from .netcdf_utils import CHUNK_THRESHOLD, open_variables, sample_points
 
 class CopernicusService:
+    # Bounded pool shared by all instances, so concurrent requests can't
+    # pile up an unlimited number of CDS retrievals
+    executor = ThreadPoolExecutor(
+        max_workers=getattr(settings, 'COPERNICUS_MAX_WORKERS', 4),
+        thread_name_prefix='copernicus'
+    )
+
     def __init__(self):
         # Initialize the CDS API client
         self.client = cdsapi.Client(
@@ -24,195 +32,298 @@ class CopernicusService:
             'elevation': 'copernicus-dem'
         }
         
-        # Cache directory for temporary files
-        self.cache_dir = tempfile.mkdtemp()
+        # Retrievals shared by all requests and reused until they expire
+        self.cache = NetCDFCache(
+            settings.COPERNICUS_CACHE_DIR,
+            ttl=getattr(settings, 'COPERNICUS_CACHE_TTL', 3600),
+            max_bytes=getattr(settings, 'COPERNICUS_CACHE_MAX_BYTES', 2 * 1024 ** 3)
+        )
+
+        # Seconds to wait for each dataset
+        self.timeouts = getattr(settings, 'COPERNICUS_DATASET_TIMEOUTS', {})
+
+        # Native grid spacing of each dataset in degrees, requested areas
+        # are snapped to it so nearby locations share one cached retrieval
+        self.grid_resolution = {
+            'climate': 0.25,  # ERA5
+            'air_quality': 0.4,  # CAMS global
+            'vegetation': 0.25,
+            'solar': 0.25
+        }
+        # Locations are grouped into fixed regions of this many degrees,
+        # each region is one retrieval per dataset
+        self.region_size = getattr(settings, 'COPERNICUS_REGION_SIZE', 5.0)
+        # Retrieved files above this size are processed in dask chunks
+        self.chunk_threshold = getattr(settings, 'COPERNICUS_CHUNK_THRESHOLD', CHUNK_THRESHOLD)
 
     def get_location_data(self, latitude: float, longitude: float) -> dict:
         """
         Get comprehensive environmental data for a specific location
         """
-        # Define area around the point (0.1 degree buffer)
-        area = [
-            latitude + 0.1, longitude - 0.1,  # North, West
-            latitude - 0.1, longitude + 0.1   # South, East
-        ]
-        
-        try:
-            # Get climate data
-            climate_data = self._get_climate_data(area)
-            
-            # Get air quality data
-            air_quality_data = self._get_air_quality_data(area)
-            
-            # Get vegetation data
-            vegetation_data = self._get_vegetation_data(area)
+        return self.get_locations_data([(latitude, longitude)])[0]
+
+    def get_locations_data(self, points: list) -> list:
+        """
+        Get environmental data for many (latitude, longitude) points at once.
+        Points are grouped by region, every region is retrieved once per
+        dataset and all of its points are sampled from the same grid.
+        """
+        points = [(float(lat), float(lon)) for lat, lon in points]
+        results = [None] * len(points)
+        regions = {}
+        for i, (lat, lon) in enumerate(points):
+            regions.setdefault(self._region(lat, lon), []).append(i)
+
+        for indices in regions.values():
+            region = [points[i] for i in indices]
+            try:
+                # Retrieve all datasets concurrently, missing ones are {}
+                data = self._retrieve_concurrently(region, {
+                    'climate': self._get_climate_data,
+                    'air_quality': self._get_air_quality_data,
+                    'vegetation': self._get_vegetation_data,
+                    'solar': self._get_solar_data
+                })
+                for k, i in enumerate(indices):
+                    results[i] = self._combine(
+                        data['climate'][k], data['air_quality'][k],
+                        data['vegetation'][k], data['solar'][k]
+                    )
+            except Exception as e:
+                # Log the error and return default values
+                print(f"Error fetching Copernicus data: {str(e)}")
+                for i in indices:
+                    results[i] = self._get_default_values()
+        return results
+
+    def _combine(self, climate_data: dict, air_quality_data: dict,
+                 vegetation_data: dict, solar_data: dict) -> dict:
+        """
+        Combine the dataset values of a point, with defaults for missing ones
+        """
+        return {
+            # Climate metrics
+            'temperature': climate_data.get('temperature', 20.0),  # °C
+            'humidity': climate_data.get('humidity', 50.0),  # %
+            'air_pressure': climate_data.get('pressure', 1013.25),  # hPa
+            'precipitation': climate_data.get('precipitation', 0.0),  # mm
             
-            # Get solar radiation data
-            solar_data = self._get_solar_data(area)
+            # Air quality metrics
+            'air_quality': air_quality_data.get('air_quality_index', 50.0),
+            'pm25': air_quality_data.get('pm25', 10.0),  # μg/m³
+            'pm10': air_quality_data.get('pm10', 20.0),  # μg/m³
+            'o3': air_quality_data.get('o3', 40.0),  # ppb
+            'no2': air_quality_data.get('no2', 20.0),  # ppb
             
-            # Combine all data
-            return {
-                # Climate metrics
-                'temperature': climate_data.get('temperature', 20.0),  # °C
-                'humidity': climate_data.get('humidity', 50.0),  # %
-                'air_pressure': climate_data.get('pressure', 1013.25),  # hPa
-                'precipitation': climate_data.get('precipitation', 0.0),  # mm
-                
-                # Air quality metrics
-                'air_quality': air_quality_data.get('air_quality_index', 50.0),
-                'pm25': air_quality_data.get('pm25', 10.0),  # μg/m³
-                'pm10': air_quality_data.get('pm10', 20.0),  # μg/m³
-                'o3': air_quality_data.get('o3', 40.0),  # ppb
-                'no2': air_quality_data.get('no2', 20.0),  # ppb
-                
-                # Environmental metrics
-                'green_space_ratio': vegetation_data.get('ndvi', 0.5),
-                'sunshine_hours': solar_data.get('sunshine_hours', 7.0),
-                'uv_index': solar_data.get('uv_index', 4.0)
-            }
-        except Exception as e:
-            # Log the error and return default values
-            print(f"Error fetching Copernicus data: {str(e)}")
-            return self._get_default_values()
+            # Environmental metrics
+            'green_space_ratio': vegetation_data.get('ndvi', 0.5),
+            'sunshine_hours': solar_data.get('sunshine_hours', 7.0),
+            'uv_index': solar_data.get('uv_index', 4.0)
+        }
+
+    def _retrieve_concurrently(self, points: list, getters: dict) -> dict:
+        """
+        Run dataset getters on the shared executor and collect their results.
+        A dataset that fails or exceeds its timeout yields empty dicts, so
+        the caller falls back to default values for it only.
+        """
+        start = time.monotonic()
+        futures = {
+            name: self.executor.submit(getter, points)
+            for name, getter in getters.items()
+        }
+        results = {}
+        for name, future in futures.items():
+            # Timeouts count from submission, all datasets wait in parallel
+            timeout = self.timeouts.get(name)
+            remaining = None if timeout is None else max(0, start + timeout - time.monotonic())
+            try:
+                results[name] = future.result(timeout=remaining)
+            except TimeoutError:
+                # The retrieval can't be interrupted, its result is discarded
+                future.cancel()
+                print(f"Timeout in {name} data retrieval after {timeout}s")
+                results[name] = [{} for _ in points]
+            except Exception as e:
+                print(f"Error in {name} data retrieval: {str(e)}")
+                results[name] = [{} for _ in points]
+        return results
+
+    def _region(self, latitude: float, longitude: float) -> tuple:
+        """
+        Return the (row, column) of the fixed region containing a point
+        """
+        return (
+            int(np.floor(latitude / self.region_size)),
+            int(np.floor(longitude / self.region_size))
+        )
+
+    def _region_area(self, name: str, points: list) -> list:
+        """
+        Return the CDS area [North, West, South, East] of the region
+        containing the points. The region cell is snapped outward to the
+        dataset's native grid and padded by one grid cell, so the area only
+        depends on the region and every point inside can be interpolated
+        from its surrounding grid values.
+        """
+        resolution = self.grid_resolution[name]
+        row, column = self._region(*points[0])
+        # Rounded before snapping so float noise can't move an edge a cell
+        def snap(degrees, edge):
+            return edge(round(degrees / resolution, 6)) * resolution
+        south = snap(row * self.region_size, np.floor) - resolution
+        north = snap((row + 1) * self.region_size, np.ceil) + resolution
+        west = snap(column * self.region_size, np.floor) - resolution
+        east = snap((column + 1) * self.region_size, np.ceil) + resolution
+        # Rounded so float noise can't change the cache key
+        return [
+            round(float(min(north, 90)), 4), round(float(west), 4),
+            round(float(max(south, -90)), 4), round(float(east), 4)
+        ]
+
+    def _retrieve(self, name: str, request: dict) -> str:
+        """
+        Return the NetCDF file of a dataset request, from the cache or from
+        the CDS queue on a miss
+        """
+        dataset = self.datasets[name]
+        path = self.cache.fetch(
+            dataset, request,
+            lambda target: self.client.retrieve(dataset, request, target)
+        )
+        return str(path)
 
-    def _get_climate_data(self, area: list) -> dict:
+    def _get_climate_data(self, points: list) -> list:
         """
         Retrieve temperature, humidity, and pressure data
         """
         try:
             # Download data
-            filename = os.path.join(self.cache_dir, 'climate.nc')
-            self.client.retrieve(
-                self.datasets['climate'],
-                {
-                    'product_type': 'reanalysis',
-                    'variable': [
-                        '2m_temperature',
-                        '2m_dewpoint_temperature',
-                        'surface_pressure',
-                        'total_precipitation'
-                    ],
-                    'year': datetime.now().strftime('%Y'),
-                    'month': datetime.now().strftime('%m'),
-                    'day': datetime.now().strftime('%d'),
-                    'time': [datetime.now().strftime('%H:00')],
-                    'area': area,
-                    'format': 'netcdf'
-                },
-                filename
-            )
+            filename = self._retrieve('climate', {
+                'product_type': 'reanalysis',
+                'variable': [
+                    '2m_temperature',
+                    '2m_dewpoint_temperature',
+                    'surface_pressure',
+                    'total_precipitation'
+                ],
+                'year': datetime.now().strftime('%Y'),
+                'month': datetime.now().strftime('%m'),
+                'day': datetime.now().strftime('%d'),
+                'time': [datetime.now().strftime('%H:00')],
+                'area': self._region_area('climate', points),
+                'format': 'netcdf'
+            })
             
             # Process data
-            ds = xr.open_dataset(filename)
-            df = ds.to_dataframe().mean()
+            with open_variables(filename, [
+                '2m_temperature',
+                '2m_dewpoint_temperature',
+                'surface_pressure',
+                'total_precipitation'
+            ], self.chunk_threshold) as ds:
+                df = sample_points(ds, points)
             
-            return {
-                'temperature': float(df['2m_temperature'] - 273.15),  # K to °C
+            return [{
+                'temperature': float(row['2m_temperature'] - 273.15),  # K to °C
                 'humidity': self._calculate_humidity(
-                    float(df['2m_temperature']),
-                    float(df['2m_dewpoint_temperature'])
+                    float(row['2m_temperature']),
+                    float(row['2m_dewpoint_temperature'])
                 ),
-                'pressure': float(df['surface_pressure'] / 100),  # Pa to hPa
-                'precipitation': float(df['total_precipitation'] * 1000)  # m to mm
-            }
+                'pressure': float(row['surface_pressure'] / 100),  # Pa to hPa
+                'precipitation': float(row['total_precipitation'] * 1000)  # m to mm
+            } for _, row in df.iterrows()]
         except Exception as e:
             print(f"Error in climate data retrieval: {str(e)}")
-            return {}
+            return [{} for _ in points]
 
-    def _get_air_quality_data(self, area: list) -> dict:
+    def _get_air_quality_data(self, points: list) -> list:
         """
         Retrieve air quality data
         """
         try:
-            filename = os.path.join(self.cache_dir, 'air_quality.nc')
-            self.client.retrieve(
-                self.datasets['air_quality'],
-                {
-                    'variable': [
-                        'particulate_matter_10um',
-                        'particulate_matter_2.5um',
-                        'ozone',
-                        'nitrogen_dioxide'
-                    ],
-                    'time': datetime.now().strftime('%Y-%m-%d'),
-                    'area': area,
-                    'format': 'netcdf'
-                },
-                filename
-            )
+            filename = self._retrieve('air_quality', {
+                'variable': [
+                    'particulate_matter_10um',
+                    'particulate_matter_2.5um',
+                    'ozone',
+                    'nitrogen_dioxide'
+                ],
+                'time': datetime.now().strftime('%Y-%m-%d'),
+                'area': self._region_area('air_quality', points),
+                'format': 'netcdf'
+            })
             
-            ds = xr.open_dataset(filename)
-            df = ds.to_dataframe().mean()
+            with open_variables(filename, [
+                'particulate_matter_10um',
+                'particulate_matter_2.5um',
+                'ozone',
+                'nitrogen_dioxide'
+            ], self.chunk_threshold) as ds:
+                df = sample_points(ds, points)
             
             # Calculate AQI based on EPA standards
-            return {
-                'pm10': float(df['particulate_matter_10um']),
-                'pm25': float(df['particulate_matter_2.5um']),
-                'o3': float(df['ozone']),
-                'no2': float(df['nitrogen_dioxide']),
-                'air_quality_index': self._calculate_aqi(df)
-            }
+            return [{
+                'pm10': float(row['particulate_matter_10um']),
+                'pm25': float(row['particulate_matter_2.5um']),
+                'o3': float(row['ozone']),
+                'no2': float(row['nitrogen_dioxide']),
+                'air_quality_index': self._calculate_aqi(row)
+            } for _, row in df.iterrows()]
         except Exception as e:
             print(f"Error in air quality data retrieval: {str(e)}")
-            return {}
+            return [{} for _ in points]
 
-    def _get_vegetation_data(self, area: list) -> dict:
+    def _get_vegetation_data(self, points: list) -> list:
         """
         Retrieve vegetation (NDVI) data
         """
         try:
-            filename = os.path.join(self.cache_dir, 'vegetation.nc')
-            self.client.retrieve(
-                self.datasets['vegetation'],
-                {
-                    'variable': 'normalized_difference_vegetation_index',
-                    'time': datetime.now().strftime('%Y-%m-%d'),
-                    'area': area,
-                    'format': 'netcdf'
-                },
-                filename
-            )
+            filename = self._retrieve('vegetation', {
+                'variable': 'normalized_difference_vegetation_index',
+                'time': datetime.now().strftime('%Y-%m-%d'),
+                'area': self._region_area('vegetation', points),
+                'format': 'netcdf'
+            })
             
-            ds = xr.open_dataset(filename)
-            ndvi = float(ds['ndvi'].mean())
+            with open_variables(filename, ['ndvi'], self.chunk_threshold) as ds:
+                ndvi = sample_points(ds, points)['ndvi']
             
-            return {
-                'ndvi': max(0, min(1, ndvi))  # Normalize to 0-1
-            }
+            return [{
+                'ndvi': max(0, min(1, float(value)))  # Normalize to 0-1
+            } for value in ndvi]
         except Exception as e:
             print(f"Error in vegetation data retrieval: {str(e)}")
-            return {}
+            return [{} for _ in points]
 
-    def _get_solar_data(self, area: list) -> dict:
+    def _get_solar_data(self, points: list) -> list:
         """
         Retrieve solar radiation data
         """
         try:
-            filename = os.path.join(self.cache_dir, 'solar.nc')
-            self.client.retrieve(
-                self.datasets['solar'],
-                {
-                    'variable': [
-                        'surface_solar_radiation_downwards',
-                        'uv_index'
-                    ],
-                    'time': datetime.now().strftime('%Y-%m-%d'),
-                    'area': area,
-                    'format': 'netcdf'
-                },
-                filename
-            )
+            filename = self._retrieve('solar', {
+                'variable': [
+                    'surface_solar_radiation_downwards',
+                    'uv_index'
+                ],
+                'time': datetime.now().strftime('%Y-%m-%d'),
+                'area': self._region_area('solar', points),
+                'format': 'netcdf'
+            })
             
-            ds = xr.open_dataset(filename)
-            df = ds.to_dataframe().mean()
+            with open_variables(filename, [
+                'surface_solar_radiation_downwards',
+                'uv_index'
+            ], self.chunk_threshold) as ds:
+                df = sample_points(ds, points)
             
-            return {
-                'sunshine_hours': self._calculate_sunshine_hours(df),
-                'uv_index': float(df['uv_index'])
-            }
+            return [{
+                'sunshine_hours': self._calculate_sunshine_hours(row),
+                'uv_index': float(row['uv_index'])
+            } for _, row in df.iterrows()]
         except Exception as e:
             print(f"Error in solar data retrieval: {str(e)}")
-            return {}
+            return [{} for _ in points]
 
     def _calculate_humidity(self, t: float, td: float) -> float:
         """Calculate relative humidity from temperature and dewpoint"""
@@ -154,14 +154,14 @@ class LocationService:
             )
         ).distinct()
         
+        # Get new characteristics of all locations in one batch
+        locations = list(locations)
+        characteristics_list = self.copernicus_service.get_locations_data([
+            (location.latitude, location.longitude) for location in locations
+        ])
+        
         # Update characteristics and health indices
-        for location in locations:
-            # Get new characteristics
-            characteristics = self.copernicus_service.get_location_data(
-                location.latitude,
-                location.longitude
-            )
-            
+        for location, characteristics in zip(locations, characteristics_list):
             # Create new characteristics record
             new_chars = LocationCharacteristics.objects.create(
                 location=location,
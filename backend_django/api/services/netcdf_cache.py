@@ -0,0 +1,103 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+import weakref
+from pathlib import Path
+from typing import Callable
+
+
+class NetCDFCache:
+    """Persistent cache of CDS retrievals, addressed by a hash of the request"""
+
+    def __init__(self, directory: str, ttl: int = 3600, max_bytes: int = 2 * 1024 ** 3):
+        self.directory = Path(directory)
+        self.ttl = ttl  # Seconds a retrieval stays valid
+        self.max_bytes = max_bytes  # Size cap of all cached files
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        # One lock per key, so concurrent requests for the same data in
+        # this process share a single retrieval. Unused locks are dropped.
+        self._locks = weakref.WeakValueDictionary()
+        self._locks_guard = threading.Lock()
+
+    @staticmethod
+    def key(dataset: str, request: dict) -> str:
+        """
+        Hash of the dataset and request, which holds the variables, time
+        slot and area of the retrieval
+        """
+        payload = json.dumps({'dataset': dataset, 'request': request}, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def path(self, key: str) -> Path:
+        return self.directory / key[:2] / f'{key}.nc'
+
+    def get(self, key: str) -> Path | None:
+        """Return the cached file of a key, or None if missing or expired"""
+        path = self.path(key)
+        try:
+            if time.time() - path.stat().st_mtime < self.ttl:
+                return path
+        except FileNotFoundError:
+            pass
+        return None
+
+    def fetch(self, dataset: str, request: dict, retrieve: Callable[[str], None]) -> Path:
+        """
+        Return the cached file of a retrieval, calling retrieve(target) to
+        download it into a unique temporary file on a miss
+        """
+        key = self.key(dataset, request)
+        with self._locks_guard:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.Lock()
+        with lock:
+            path = self.get(key)
+            if path is not None:
+                return path
+
+            path = self.path(key)
+            path.parent.mkdir(exist_ok=True)
+            # Unique per request, readers only ever see complete files
+            part = path.with_name(f'{path.name}.{uuid.uuid4().hex}.part')
+            try:
+                retrieve(str(part))
+                os.replace(part, path)
+            finally:
+                part.unlink(missing_ok=True)
+
+        self.evict()
+        return path
+
+    def evict(self) -> None:
+        """Delete expired files, then the oldest ones above the size cap"""
+        now = time.time()
+        files = []
+        for path in self.directory.glob('*/*.nc'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if now - stat.st_mtime >= self.ttl:
+                path.unlink(missing_ok=True)
+            else:
+                files.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+        # Leftovers of crashed retrievals
+        for part in self.directory.glob('*/*.part'):
+            try:
+                if now - part.stat().st_mtime >= self.ttl:
+                    part.unlink(missing_ok=True)
+            except FileNotFoundError:
+                continue
@@ -0,0 +1,55 @@
+import importlib.util
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+# Files above this size are opened as dask arrays, if dask is installed
+CHUNK_THRESHOLD = 64 * 1024 ** 2
+
+HAS_DASK = importlib.util.find_spec('dask') is not None
+
+# The netCDF-C/HDF5 libraries aren't thread-safe, files are read one at a
+# time while retrievals still run concurrently
+_read_lock = threading.Lock()
+
+
+@contextmanager
+def open_variables(filename: str, variables: list, chunk_threshold: int = CHUNK_THRESHOLD):
+    """
+    Open only the needed variables of a NetCDF file and close it when done.
+    Values are loaded lazily, large files in dask chunks, so results must be
+    computed inside the with block, which holds the read lock.
+    """
+    chunks = {} if HAS_DASK and os.path.getsize(filename) > chunk_threshold else None
+    with _read_lock:
+        ds = xr.open_dataset(filename, chunks=chunks)
+        try:
+            yield ds[variables]
+        finally:
+            ds.close()
+
+
+def sample_points(ds: xr.Dataset, points: list) -> pd.DataFrame:
+    """
+    Interpolate the variables of a grid linearly at all (latitude, longitude)
+    points in one vectorized selection and average them over the remaining
+    dimensions, e.g. time. Returns one row per point.
+    """
+    latitudes, longitudes = np.asarray(points, dtype=float).T
+    selection = {}
+    if ds.sizes.get('latitude', 0) > 1:
+        selection['latitude'] = xr.DataArray(latitudes, dims='point')
+    if ds.sizes.get('longitude', 0) > 1:
+        selection['longitude'] = xr.DataArray(longitudes, dims='point')
+    if selection:
+        ds = ds.interp(selection)
+    ds = ds.mean([dim for dim in ds.dims if dim != 'point'])
+    if 'point' not in ds.dims:
+        ds = ds.expand_dims(point=len(points))
+    # Single compute of all variables, also for dask-backed datasets
+    ds = ds.compute()
+    return pd.DataFrame({name: var.values for name, var in ds.data_vars.items()})
@@ -0,0 +1,249 @@
+"""Module providing an asyncio download engine for CDSE products with a
+global concurrency limit and a shared bandwidth cap."""
+
+import asyncio
+import os
+import time
+import logging as log
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import httpx
+import pandas as pd
+from tqdm import tqdm
+
+from .copernicus_api import (
+    CHUNK_SIZE,
+    _progress_file,
+    is_downloaded,
+    product_checksum,
+    product_content_length,
+)
+from .session import RETRY_STATUSES
+
+
+class TokenBucket:
+    """Asyncio token bucket limiting the combined throughput of all
+    downloads.
+
+    Parameters
+    ----------
+    rate : float
+        Sustained rate in bytes per second
+    capacity : float, optional
+        Maximum burst in bytes, defaults to one second worth of `rate`
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None) -> None:
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def consume(self, amount: int) -> None:
+        """Wait until `amount` bytes may be transferred."""
+        async with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= amount
+            # Waiting with the lock held keeps the other consumers in line
+            if self._tokens < 0:
+                await asyncio.sleep(-self._tokens / self.rate)
+
+
+@dataclass
+class DownloadResult:
+    """Outcome of a single product download"""
+
+    uid: str
+    name: str
+    path: Path | None = None
+    bytes: int = 0
+    elapsed: float = 0.0
+    skipped: bool = False
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def bytes_per_s(self) -> float:
+        return self.bytes / self.elapsed if self.elapsed else 0.0
+
+
+@dataclass
+class DownloadReport:
+    """Aggregated outcome of `download_all_async`"""
+
+    results: list[DownloadResult] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def errors(self) -> dict[str, str]:
+        """Error messages of failed downloads by product name"""
+        return {r.name: r.error for r in self.results if not r.ok}
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(r.bytes for r in self.results)
+
+    def summary(self) -> dict:
+        """Return product counts, transferred bytes and overall throughput."""
+        return {
+            "products": len(self.results),
+            "downloaded": sum(r.ok and not r.skipped for r in self.results),
+            "skipped": sum(r.skipped for r in self.results),
+            "failed": len(self.errors),
+            "bytes": self.total_bytes,
+            "elapsed": self.elapsed,
+            "bytes_per_s": self.total_bytes / self.elapsed if self.elapsed else 0.0,
+        }
+
+
+async def _download_product(
+    api,
+    client: httpx.AsyncClient,
+    semaphore: asyncio.Semaphore,
+    bucket: TokenBucket | None,
+    result: DownloadResult,
+    out_path: Path,
+    content_length: int | None,
+    checksum: str | None,
+) -> DownloadResult:
+    """Resumable download of a single product into `<out_path>.zip`, see
+    `CopernicusDataspaceAPI.download_by_id`."""
+    out_file = Path(str(out_path) + ".zip")
+    part_file = Path(str(out_file) + ".part")
+    url = f"{api.download_url}({result.uid})/$value"
+
+    async with semaphore:
+        start = time.perf_counter()
+        try:
+            progress_file = _progress_file(part_file)
+            if progress_file.exists():
+                # A preallocated segmented download can't be resumed by size
+                log.info(f"Discarding segmented download {part_file.name}")
+                part_file.unlink(missing_ok=True)
+                progress_file.unlink()
+            for attempt in range(api.retries + 1):
+                offset = part_file.stat().st_size if part_file.exists() else 0
+                if content_length is not None and offset >= content_length:
+                    break
+                token = await asyncio.to_thread(api._get_access_token)
+                headers = {"Authorization": f"Bearer {token}"}
+                if offset:
+                    headers["Range"] = f"bytes={offset}-"
+                try:
+                    async with client.stream("GET", url, headers=headers) as response:
+                        if response.status_code == 416:
+                            break
+                        if response.status_code == 401:
+                            api.token_manager.invalidate()
+                        response.raise_for_status()
+                        mode = "ab" if response.status_code == 206 else "wb"
+                        with open(part_file, mode) as file:
+                            async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                                if bucket:
+                                    await bucket.consume(len(chunk))
+                                file.write(chunk)
+                                result.bytes += len(chunk)
+                    size = part_file.stat().st_size
+                    if content_length is None or size >= content_length:
+                        break
+                except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                    status = (
+                        e.response.status_code
+                        if isinstance(e, httpx.HTTPStatusError)
+                        else None
+                    )
+                    if attempt == api.retries or status not in (
+                        None,
+                        401,
+                        *RETRY_STATUSES,
+                    ):
+                        raise
+                    delay = api.backoff_factor * 2**attempt
+                    if status is not None:
+                        retry_after = e.response.headers.get("Retry-After", "")
+                        if retry_after.isdigit():
+                            delay = int(retry_after)
+                    log.info(
+                        f"Download of {result.name} interrupted ({e}), resuming in "
+                        f"{delay:.1f}s ({attempt + 1}/{api.retries})"
+                    )
+                    await asyncio.sleep(delay)
+
+            await asyncio.to_thread(
+                api._verify_download, part_file, content_length, checksum
+            )
+            os.replace(part_file, out_file)
+            result.path = out_file
+        except Exception as e:
+            result.error = f"{e.__class__.__name__}: {e}"
+        result.elapsed = time.perf_counter() - start
+    return result
+
+
+async def download_products(
+    api,
+    products: pd.DataFrame,
+    out_dir: Path,
+    concurrency: int = 4,
+    bandwidth: float | None = None,
+    show_progress: bool = True,
+) -> DownloadReport:
+    """Download products concurrently with asyncio.
+
+    See `CopernicusDataspaceAPI.download_all_async` for the parameters.
+    """
+    start = time.perf_counter()
+    semaphore = asyncio.Semaphore(concurrency)
+    bucket = TokenBucket(bandwidth) if bandwidth else None
+    limits = httpx.Limits(
+        max_connections=concurrency, max_keepalive_connections=concurrency
+    )
+    pbar = tqdm(total=len(products), unit="files") if show_progress else None
+
+    async def track(task) -> DownloadResult:
+        result = await task
+        if pbar:
+            pbar.update(1)
+        return result
+
+    async with httpx.AsyncClient(
+        limits=limits, timeout=100, follow_redirects=True
+    ) as client:
+        tasks = []
+        for _, prod in products.iterrows():
+            out_path = out_dir / f"{prod.Name}"
+            content_length = product_content_length(prod)
+            result = DownloadResult(prod.Id, prod.Name)
+            if is_downloaded(out_path, content_length):
+                result.skipped = True
+                result.path = Path(str(out_path) + ".zip")
+                tasks.append(track(asyncio.sleep(0, result)))
+                continue
+            download = _download_product(
+                api,
+                client,
+                semaphore,
+                bucket,
+                result,
+                out_path,
+                content_length,
+                product_checksum(prod),
+            )
+            tasks.append(track(download))
+        results = await asyncio.gather(*tasks)
+
+    if pbar:
+        pbar.close()
+    report = DownloadReport(list(results), time.perf_counter() - start)
+    for name, error in report.errors.items():
+        log.error(f"Failed to download {name}: {error}")
+    return report
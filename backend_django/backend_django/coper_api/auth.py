@@ -0,0 +1,110 @@
+"""Module providing a shared, thread-safe access token cache for CDSE"""
+
+import threading
+import time
+import logging as log
+
+import requests
+
+from .exceptions import AuthorizationError
+
+
+class TokenManager:
+    """Caches the CDSE access token and renews it shortly before it expires.
+
+    The access token is reused until `expiry_margin` seconds before its
+    expiry. It is then renewed with the refresh token, falling back to a
+    password grant when the refresh token is expired or rejected. Renewal is
+    serialized by a lock, so concurrent callers waiting for a new token
+    share a single request to the identity server.
+
+    Parameters
+    ----------
+    username : string
+        username for Copernicus dataspace
+    password : string
+        password for Copernicus dataspace
+    token_url : string
+        OpenID Connect token endpoint
+    client_id : string, optional
+        OpenID Connect client id
+    expiry_margin : float, optional
+        Seconds before expiry at which a token is considered stale
+    session : requests.Session, optional
+        Session used for token requests
+    """
+
+    def __init__(
+        self,
+        username: str,
+        password: str,
+        token_url: str,
+        client_id: str = "cdse-public",
+        expiry_margin: float = 60,
+        session: requests.Session | None = None,
+    ) -> None:
+        self.username = username
+        self.password = password
+        self.token_url = token_url
+        self.client_id = client_id
+        self.expiry_margin = expiry_margin
+        self.session = session
+        self.requests_made = 0
+        self._lock = threading.Lock()
+        self._access_token: str | None = None
+        self._expires_at = 0.0
+        self._refresh_token: str | None = None
+        self._refresh_expires_at = 0.0
+
+    def get_token(self) -> str:
+        """Return a valid access token, renewing it if necessary."""
+        with self._lock:
+            now = time.monotonic()
+            if self._access_token and now < self._expires_at - self.expiry_margin:
+                return self._access_token
+            if self._refresh_token and now < self._refresh_expires_at:
+                try:
+                    self._request_token(
+                        {
+                            "grant_type": "refresh_token",
+                            "refresh_token": self._refresh_token,
+                        }
+                    )
+                    return self._access_token
+                except AuthorizationError as e:
+                    log.info(f"Token refresh failed, logging in again: {e}")
+            self._request_token(
+                {
+                    "grant_type": "password",
+                    "username": self.username,
+                    "password": self.password,
+                }
+            )
+            return self._access_token
+
+    def invalidate(self) -> None:
+        """Drop the cached access token, e.g. after a 401 response."""
+        with self._lock:
+            self._access_token = None
+            self._expires_at = 0.0
+
+    def _request_token(self, data: dict) -> None:
+        post = self.session.post if self.session else requests.post
+        requested_at = time.monotonic()
+        self.requests_made += 1
+        try:
+            r = post(
+                self.token_url, data={"client_id": self.client_id, **data}, timeout=100
+            )
+            r.raise_for_status()
+            token = r.json()
+        except Exception as e:
+            raise AuthorizationError(
+                f"Access token creation failed. Error: {e} \n"
+                f"\tMake sure your login credentials are correct for"
+                " https://dataspace.copernicus.eu/"
+            )
+        self._access_token = token["access_token"]
+        self._expires_at = requested_at + token.get("expires_in", 0)
+        self._refresh_token = token.get("refresh_token")
+        self._refresh_expires_at = requested_at + token.get("refresh_expires_in", 0)
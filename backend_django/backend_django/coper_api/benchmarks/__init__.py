@@ -0,0 +1,5 @@
+"""Benchmarks for the Copernicus Data Space client.
+
+Run a benchmark as a module from the Django project root, e.g.:
+    python -m backend_django.coper_api.benchmarks.bench_attributes
+"""
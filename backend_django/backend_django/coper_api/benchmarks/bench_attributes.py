@@ -0,0 +1,78 @@
+"""Benchmark of product attribute expansion: columnar pivot vs per-row apply."""
+
+import argparse
+import random
+import timeit
+
+import pandas as pd
+
+from ..copernicus_api import expand_attributes
+
+
+def add_attrs_to_df(product: pd.Series) -> pd.Series:
+    "Previous per-row implementation, kept as the benchmark baseline"
+    attributes = product.get("Attributes", [])
+    for attr in attributes:
+        product[attr["Name"]] = attr["Value"]
+    return product
+
+
+def synthetic_products(n: int, seed: int = 0) -> pd.DataFrame:
+    """Sentinel-2 like catalogue response with ~20 attributes per product"""
+    rnd = random.Random(seed)
+    rows = []
+    for i in range(n):
+        attributes = [
+            {"Name": "cloudCover", "Value": rnd.uniform(0, 100)},
+            {"Name": "orbitNumber", "Value": rnd.randint(1, 50000)},
+            {"Name": "relativeOrbitNumber", "Value": rnd.randint(1, 143)},
+            {"Name": "tileId", "Value": f"34T{rnd.choice('DEFG')}{rnd.choice('KLM')}"},
+            {"Name": "productType", "Value": rnd.choice(["S2MSI1C", "S2MSI2A"])},
+            {"Name": "platformShortName", "Value": "SENTINEL-2"},
+            {"Name": "platformSerialIdentifier", "Value": rnd.choice("AB")},
+            {"Name": "processingLevel", "Value": rnd.choice(["S2MSI1C", "S2MSI2A"])},
+            {"Name": "instrumentShortName", "Value": "MSI"},
+            {"Name": "operationalMode", "Value": "INS-NOBS"},
+            {"Name": "processorVersion", "Value": "05.10"},
+            {"Name": "datastripId", "Value": f"DS_{i:08d}"},
+            {"Name": "granuleIdentifier", "Value": f"GR_{i:08d}"},
+            {"Name": "beginningDateTime", "Value": "2024-01-01T10:00:00.000Z"},
+            {"Name": "endingDateTime", "Value": "2024-01-01T10:00:10.000Z"},
+            {"Name": "illuminationZenithAngle", "Value": rnd.uniform(20, 70)},
+            {"Name": "illuminationAzimuthAngle", "Value": rnd.uniform(120, 180)},
+            {"Name": "qualityStatus", "Value": "NOMINAL"},
+            {"Name": "origin", "Value": "ESA"},
+            {"Name": "authority", "Value": "ESA"},
+        ]
+        rows.append({"Id": f"{i:032x}", "Name": f"S2_{i}", "Attributes": attributes})
+    return pd.DataFrame(rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'products':>9} {'apply [s]':>10} {'pivot [s]':>10} {'speedup':>8}")
+    for n in args.products:
+        products = synthetic_products(n)
+        apply_s = min(
+            timeit.repeat(
+                lambda: products.apply(add_attrs_to_df, axis=1),
+                number=1,
+                repeat=args.repeat,
+            )
+        )
+        pivot_s = min(
+            timeit.repeat(
+                lambda: expand_attributes(products),
+                number=1,
+                repeat=args.repeat,
+            )
+        )
+        print(f"{n:>9} {apply_s:>10.4f} {pivot_s:>10.4f} {apply_s / pivot_s:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
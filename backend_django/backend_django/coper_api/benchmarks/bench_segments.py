@@ -0,0 +1,56 @@
+"""Benchmark of single stream vs segmented download of one large product."""
+
+import argparse
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from ..copernicus_api import Sentinel1API
+from .mock_cdse import MockCDSE
+
+MiB = 1024 * 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mib", type=int, default=64)
+    parser.add_argument(
+        "--bandwidth-mib",
+        type=float,
+        default=16.0,
+        help="per connection bandwidth of the mock server",
+    )
+    parser.add_argument("--segments", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    size = args.size_mib * MiB
+    with MockCDSE(bandwidth=args.bandwidth_mib * MiB, products={"slc": size}) as mock:
+        api = Sentinel1API(
+            mock.username,
+            mock.password,
+            token_url=mock.token_url,
+            download_url=mock.download_url,
+        )
+        checksum = mock.checksum("slc")
+        print(f"{'segments':>8} {'elapsed [s]':>12} {'MiB/s':>8}")
+        for segments in args.segments:
+            out_dir = Path(tempfile.mkdtemp())
+            try:
+                start = time.perf_counter()
+                api.download_by_id(
+                    "slc",
+                    out_dir / "product",
+                    content_length=size,
+                    checksum=checksum,
+                    segments=segments,
+                    segment_threshold=0,
+                )
+                elapsed = time.perf_counter() - start
+            finally:
+                shutil.rmtree(out_dir)
+            print(f"{segments:>8} {elapsed:>12.2f} {size / MiB / elapsed:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Benchmark of a single month-long query vs concurrent sub-window queries
+against the mock OData catalogue."""
+
+import argparse
+import time
+
+from ..copernicus_api import Sentinel2API
+from .mock_cdse import MockCDSE, synthetic_catalog
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=6000)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--product-latency", type=float, default=0.0005)
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4, 8])
+    args = parser.parse_args()
+
+    catalog = synthetic_catalog("SENTINEL-2", args.products, "2024-01-01", "2024-02-01")
+    with MockCDSE(
+        catalog=catalog,
+        latency=args.latency,
+        product_latency=args.product_latency,
+    ) as mock:
+        api = Sentinel2API(
+            mock.username,
+            mock.password,
+            token_url=mock.token_url,
+            catalog_url=mock.catalog_url,
+        )
+        window = dict(start_time="2024-01-01", end_time="2024-02-01", orderby="asc")
+
+        start = time.perf_counter()
+        baseline = api.query(**window)
+        serial = time.perf_counter() - start
+        print(
+            f"{'split':>6} {'workers':>8} {'products':>9} {'elapsed [s]':>12} {'speedup':>8}"
+        )
+        print(f"{'-':>6} {1:>8} {len(baseline):>9} {serial:>12.2f} {1:>7.1f}x")
+
+        for split in ("week", "day"):
+            for workers in args.workers:
+                start = time.perf_counter()
+                products = api.query(**window, split=split, split_workers=workers)
+                elapsed = time.perf_counter() - start
+                assert products["Id"].tolist() == baseline["Id"].tolist()
+                print(
+                    f"{split:>6} {workers:>8} {len(products):>9} "
+                    f"{elapsed:>12.2f} {serial / elapsed:>7.1f}x"
+                )
+
+
+if __name__ == "__main__":
+    main()
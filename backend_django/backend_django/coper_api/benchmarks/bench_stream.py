@@ -0,0 +1,49 @@
+"""Benchmark of peak memory and time of buffered vs streamed catalogue
+response parsing against the mock OData catalogue."""
+
+import argparse
+import time
+import tracemalloc
+
+from ..copernicus_api import Sentinel2API
+from .mock_cdse import MockCDSE, synthetic_catalog
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--chunk-rows", type=int, default=250)
+    args = parser.parse_args()
+
+    catalog = synthetic_catalog("SENTINEL-2", args.products, "2024-01-01", "2024-02-01")
+    with MockCDSE(catalog=catalog) as mock:
+        api = Sentinel2API(
+            mock.username,
+            mock.password,
+            token_url=mock.token_url,
+            catalog_url=mock.catalog_url,
+        )
+        print(f"{'mode':>9} {'products':>9} {'peak [MiB]':>11} {'elapsed [s]':>12}")
+        for stream in (False, True):
+            tracemalloc.start()
+            start = time.perf_counter()
+            count = 0
+            # Consume chunks one by one, as a bounded memory pipeline would
+            for chunk in api.query_iter(
+                start_time="2024-01-01",
+                end_time="2024-02-01",
+                page_size=args.page_size,
+                stream=stream,
+                chunk_rows=args.chunk_rows,
+            ):
+                count += len(chunk)
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1] / 2**20
+            tracemalloc.stop()
+            mode = "streamed" if stream else "buffered"
+            print(f"{mode:>9} {count:>9} {peak:>11.1f} {elapsed:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
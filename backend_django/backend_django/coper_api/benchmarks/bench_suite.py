@@ -0,0 +1,178 @@
+"""Reproducible workload for tuning `query()` page sizes and `download_all()`
+thread counts against the mock CDSE, with optional latency, bandwidth limits
+and injected failures.
+
+Results are printed and can be written to JSON to compare versions, e.g.:
+    python -m backend_django.coper_api.benchmarks.bench_suite --output base.json
+"""
+
+import argparse
+import json
+import platform
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+from ..copernicus_api import Sentinel2API, is_downloaded
+from .mock_cdse import MockCDSE, synthetic_catalog
+
+WINDOW = dict(start_time="2024-01-01", end_time="2024-02-01", orderby="asc")
+
+
+def client(mock: MockCDSE, retries: int) -> Sentinel2API:
+    """Fresh client, so request statistics and connections are per run"""
+    return Sentinel2API(
+        mock.username,
+        mock.password,
+        token_url=mock.token_url,
+        catalog_url=mock.catalog_url,
+        download_url=mock.download_url,
+        retries=retries,
+        backoff_factor=0.01,
+    )
+
+
+def measure(run) -> tuple[float, float]:
+    """Elapsed seconds and peak traced memory in MiB of `run()`"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        run()
+    finally:
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    return elapsed, peak
+
+
+def bench_query(mock: MockCDSE, args: argparse.Namespace) -> list[dict]:
+    results = []
+    for page_size in args.page_sizes:
+        api = client(mock, args.retries)
+        found = []
+        elapsed, peak = measure(
+            lambda: found.append(len(api.query(**WINDOW, page_size=page_size)))
+        )
+        results.append(
+            {
+                "page_size": page_size,
+                "products": found[0],
+                "elapsed": elapsed,
+                "products_per_s": found[0] / elapsed,
+                "peak_mib": peak,
+                **api.http_stats.summary(),
+            }
+        )
+    return results
+
+
+def bench_download(mock: MockCDSE, args: argparse.Namespace) -> list[dict]:
+    products = client(mock, args.retries).query(**WINDOW).head(args.downloads)
+    results = []
+    for threads in args.threads:
+        api = client(mock, args.retries)
+        with tempfile.TemporaryDirectory() as out_dir:
+            elapsed, peak = measure(
+                lambda: api.download_all(
+                    products, out_dir, threads=threads, show_progress=False
+                )
+            )
+            done = sum(
+                is_downloaded(Path(out_dir) / name, size)
+                for name, size in zip(products["Name"], products["ContentLength"])
+            )
+        total = args.size * done
+        results.append(
+            {
+                "threads": threads,
+                "products": len(products),
+                "completed": done,
+                "elapsed": elapsed,
+                "mib_per_s": total / 2**20 / elapsed,
+                "peak_mib": peak,
+                **api.http_stats.summary(),
+            }
+        )
+    return results
+
+
+def ms(value: float | None) -> str:
+    return f"{value * 1000:.1f}" if value is not None else "-"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--products", type=int, default=3000)
+    parser.add_argument("--downloads", type=int, default=32)
+    parser.add_argument("--size", type=int, default=4 * 1024 * 1024)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--product-latency", type=float, default=0.0001)
+    parser.add_argument("--bandwidth", type=float, default=20 * 1024 * 1024)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--retries", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--page-sizes", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--label", default="", help="Version label stored in JSON")
+    parser.add_argument("--output", type=Path, help="Write results to this file")
+    args = parser.parse_args()
+
+    catalog = synthetic_catalog(
+        "SENTINEL-2", args.products, "2024-01-01", "2024-02-01", size=args.size
+    )
+    with MockCDSE(
+        catalog=catalog,
+        latency=args.latency,
+        bandwidth=args.bandwidth,
+        product_latency=args.product_latency,
+        failure_rate=args.failure_rate,
+        drop_rate=args.drop_rate,
+        seed=args.seed,
+    ) as mock:
+        queries = bench_query(mock, args)
+        downloads = bench_download(mock, args)
+        injected = dict(mock.stats)
+
+    print(
+        f"{'page size':>10} {'products':>9} {'elapsed [s]':>12} {'products/s':>11}"
+        f" {'p50 [ms]':>9} {'p99 [ms]':>9} {'retries':>8} {'peak [MiB]':>11}"
+    )
+    for r in queries:
+        print(
+            f"{r['page_size']:>10} {r['products']:>9} {r['elapsed']:>12.2f}"
+            f" {r['products_per_s']:>11.0f} {ms(r['latency_p50']):>9}"
+            f" {ms(r['latency_p99']):>9} {r['retries']:>8} {r['peak_mib']:>11.1f}"
+        )
+    print(
+        f"\n{'threads':>10} {'completed':>9} {'elapsed [s]':>12} {'MiB/s':>11}"
+        f" {'p50 [ms]':>9} {'p99 [ms]':>9} {'retries':>8} {'peak [MiB]':>11}"
+    )
+    for r in downloads:
+        print(
+            f"{r['threads']:>10} {r['completed']:>9} {r['elapsed']:>12.2f}"
+            f" {r['mib_per_s']:>11.1f} {ms(r['latency_p50']):>9}"
+            f" {ms(r['latency_p99']):>9} {r['retries']:>8} {r['peak_mib']:>11.1f}"
+        )
+
+    if args.output:
+        report = {
+            "label": args.label,
+            "created": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {k: v for k, v in vars(args).items() if k != "output"},
+            "server": injected,
+            "query": queries,
+            "download": downloads,
+        }
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
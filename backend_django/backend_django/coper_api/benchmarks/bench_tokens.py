@@ -0,0 +1,39 @@
+"""Benchmark of access token requests made by concurrent download workers."""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ..copernicus_api import Sentinel2API
+from .mock_cdse import MockCDSE
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--token-lifetime", type=int, default=600)
+    args = parser.parse_args()
+
+    with MockCDSE(latency=args.latency, token_lifetime=args.token_lifetime) as mock:
+        api = Sentinel2API(mock.username, mock.password, token_url=mock.token_url)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.threads) as executor:
+            tokens = list(
+                executor.map(lambda _: api._get_access_token(), range(args.products))
+            )
+        elapsed = time.perf_counter() - start
+
+    print(f"token lookups:   {len(tokens)}")
+    print(f"distinct tokens: {len(set(tokens))}")
+    print(f"token requests:  {dict(mock.stats)}")
+    print(f"elapsed:         {elapsed:.3f}s")
+    print(
+        f"one password grant per product would take "
+        f"~{args.products * args.latency / args.threads:.3f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
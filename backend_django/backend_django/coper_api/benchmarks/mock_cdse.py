@@ -0,0 +1,458 @@
+"""Local stand-in for the CDSE endpoints used by the benchmarks."""
+
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+# Product payloads repeat a pseudo random block of this size
+BLOCK_SIZE = 64 * 1024
+# Bytes written to the socket between bandwidth throttling pauses
+SEND_SIZE = 64 * 1024
+PRODUCT_PATH = re.compile(r"^/odata/v1/Products\((?P<uid>[^)]+)\)/\$value$")
+RANGE = re.compile(r"^bytes=(?P<start>\d+)-(?P<end>\d*)$")
+CATALOG_PATH = "/catalog/odata/v1/Products"
+# Default and maximum page size of the catalogue
+DEFAULT_TOP = 20
+MAX_TOP = 1000
+
+
+def synthetic_catalog(
+    mission: str,
+    n: int,
+    start: str = "2024-01-01",
+    end: str = "2024-02-01",
+    bbox: tuple[float, float, float, float] = (20.4, 40.8, 23.0, 42.4),
+    size: int = 1024 * 1024,
+    seed: int = 0,
+) -> list[dict]:
+    """Generate `n` catalogue products of `mission` acquired between `start`
+    and `end`, with square footprints inside `bbox` (minx, miny, maxx, maxy)
+    and `size` bytes content."""
+    rnd = random.Random(seed)
+    t0 = datetime.fromisoformat(start).replace(tzinfo=timezone.utc)
+    span = (
+        datetime.fromisoformat(end).replace(tzinfo=timezone.utc) - t0
+    ).total_seconds()
+    products = []
+    for i in range(n):
+        acquired = t0 + timedelta(seconds=span * (i + rnd.random()) / n)
+        x = rnd.uniform(bbox[0], bbox[2] - 0.5)
+        y = rnd.uniform(bbox[1], bbox[3] - 0.5)
+        w = rnd.uniform(0.2, 0.5)
+        stamp = acquired.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+        products.append(
+            {
+                "@odata.mediaContentType": "application/octet-stream",
+                "Id": str(uuid.UUID(int=rnd.getrandbits(128))),
+                "Name": f"{mission.replace('-', '')}_{rnd.choice(['L1C', 'L2A'])}_"
+                f"{acquired:%Y%m%dT%H%M%S}_{i:06d}.SAFE",
+                "ContentType": "application/octet-stream",
+                "ContentLength": size,
+                "OriginDate": stamp,
+                "PublicationDate": stamp,
+                "Online": True,
+                "Collection": mission,
+                "ContentDate": {"Start": stamp, "End": stamp},
+                "GeoFootprint": {
+                    "type": "Polygon",
+                    "coordinates": [
+                        [[x, y], [x + w, y], [x + w, y + w], [x, y + w], [x, y]]
+                    ],
+                },
+                "Attributes": [
+                    {
+                        "@odata.type": "#OData.CSC.DoubleAttribute",
+                        "Name": "cloudCover",
+                        "Value": round(rnd.uniform(0, 100), 2),
+                        "ValueType": "Double",
+                    },
+                    {
+                        "@odata.type": "#OData.CSC.StringAttribute",
+                        "Name": "tileId",
+                        "Value": f"34T{rnd.choice('DEFG')}{rnd.choice('KLM')}",
+                        "ValueType": "String",
+                    },
+                    {
+                        "@odata.type": "#OData.CSC.IntegerAttribute",
+                        "Name": "relativeOrbitNumber",
+                        "Value": rnd.randint(1, 143),
+                        "ValueType": "Integer",
+                    },
+                ],
+            }
+        )
+    return products
+
+
+def _literal(value: str) -> str | float:
+    if value.startswith("'"):
+        return value[1:-1].replace("''", "'")
+    return float(value)
+
+
+def _project(
+    product: dict, expand: str | None, names: list[str], select: list[str] | None
+) -> dict:
+    """Apply `$select` and `$expand=Attributes($filter=...)` to a product"""
+    projected = {
+        k: v
+        for k, v in product.items()
+        if k != "Attributes" and (select is None or k in select)
+    }
+    if expand:
+        projected["Attributes"] = [
+            attr for attr in product["Attributes"] if not names or attr["Name"] in names
+        ]
+    return projected
+
+
+class CatalogFilter:
+    """Minimal evaluator of the `$filter` expressions built by
+    `CopernicusDataspaceAPI._build_query`"""
+
+    def __init__(self, expression: str) -> None:
+        self.mission = re.search(r"Collection/Name eq '([^']+)'", expression)
+        self.after = re.search(r"ContentDate/Start gt (\S+)", expression)
+        self.before = re.search(r"ContentDate/Start lt (\S+)", expression)
+        self.contains = re.findall(r"(?<!not )contains\(Name, ?'([^']+)'\)", expression)
+        self.excludes = re.findall(r"not contains\(Name, ?'([^']+)'\)", expression)
+        # (name, [(operator, value), ...]) of each Attributes/any clause
+        self.attributes = []
+        for clause in re.split(r"(?=Attributes/OData\.CSC\.)", expression)[1:]:
+            name = re.search(r"att/Name eq '((?:[^']|'')*)'", clause)[1]
+            comparisons = [
+                (op, _literal(value))
+                for op, value in re.findall(
+                    r"/Value (eq|ge|le) ('(?:[^']|'')*'|[-+\d.eE]+)", clause
+                )
+            ]
+            self.attributes.append((name.replace("''", "'"), comparisons))
+
+    def matches_attributes(self, product: dict) -> bool:
+        values = {attr["Name"]: attr["Value"] for attr in product["Attributes"]}
+        for name, comparisons in self.attributes:
+            if name not in values:
+                return False
+            value = values[name]
+            equal = [v for op, v in comparisons if op == "eq"]
+            if equal and value not in equal:
+                return False
+            for op, bound in comparisons:
+                if (op == "ge" and value < bound) or (op == "le" and value > bound):
+                    return False
+        return True
+
+    def __call__(self, product: dict) -> bool:
+        start = product["ContentDate"]["Start"]
+        return (
+            (not self.mission or product["Collection"] == self.mission[1])
+            and (not self.after or start > self.after[1])
+            and (not self.before or start < self.before[1])
+            and all(word in product["Name"] for word in self.contains)
+            and not any(word in product["Name"] for word in self.excludes)
+            and self.matches_attributes(product)
+        )
+
+
+class MockCDSE:
+    """Serves a fake CDSE identity server, OData catalogue and zipper
+    download endpoint on localhost.
+
+    Parameters
+    ----------
+    username : string, optional
+        Accepted username for password grants
+    password : string, optional
+        Accepted password for password grants
+    token_lifetime : int, optional
+        `expires_in` of issued access tokens in seconds
+    refresh_lifetime : int, optional
+        `refresh_expires_in` of issued refresh tokens in seconds
+    latency : float, optional
+        Delay added to every response in seconds
+    bandwidth : float, optional
+        Maximum bytes per second sent on a single connection, unlimited if 0
+    products : dict, optional
+        Sizes in bytes of the downloadable products by UID
+    catalog : list, optional
+        Catalogue products, see `synthetic_catalog`. They are also
+        downloadable with their `ContentLength`.
+    next_links : bool, optional
+        Add `@odata.nextLink` to catalogue pages followed by more results
+    product_latency : float, optional
+        Delay per product of a catalogue page in seconds, on top of `latency`
+    failure_rate : float, optional
+        Fraction of catalogue and download requests answered with
+        `503 Service Unavailable`
+    drop_rate : float, optional
+        Fraction of downloads whose connection is closed halfway through
+    seed : int, optional
+        Seed of the injected failures
+    """
+
+    def __init__(
+        self,
+        username: str = "user",
+        password: str = "password",
+        token_lifetime: int = 600,
+        refresh_lifetime: int = 3600,
+        latency: float = 0.0,
+        bandwidth: float = 0.0,
+        products: dict[str, int] | None = None,
+        catalog: list[dict] | None = None,
+        next_links: bool = True,
+        product_latency: float = 0.0,
+        failure_rate: float = 0.0,
+        drop_rate: float = 0.0,
+        seed: int = 0,
+    ) -> None:
+        self.username = username
+        self.password = password
+        self.token_lifetime = token_lifetime
+        self.refresh_lifetime = refresh_lifetime
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.products = products or {}
+        self.catalog = sorted(catalog or [], key=lambda p: p["ContentDate"]["Start"])
+        self.products.update({p["Id"]: p["ContentLength"] for p in self.catalog})
+        self.next_links = next_links
+        self.product_latency = product_latency
+        self.failure_rate = failure_rate
+        self.drop_rate = drop_rate
+        self._random = random.Random(seed)
+        self.stats = Counter()
+        self._lock = threading.Lock()
+        self._refresh_tokens: set[str] = set()
+        self._access_tokens: set[str] = set()
+        self._server: ThreadingHTTPServer | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def token_url(self) -> str:
+        return f"{self.url}/token"
+
+    @property
+    def catalog_url(self) -> str:
+        return f"{self.url}{CATALOG_PATH}?$filter=Collection"
+
+    @property
+    def download_url(self) -> str:
+        return f"{self.url}/odata/v1/Products"
+
+    @staticmethod
+    def _block(uid: str) -> bytes:
+        return random.Random(uid).randbytes(BLOCK_SIZE)
+
+    def product_bytes(self, uid: str, start: int = 0, end: int | None = None) -> bytes:
+        """Return the synthetic content of product `uid` from `start` to
+        `end` (exclusive)"""
+        size = self.products[uid]
+        end = size if end is None else min(end, size)
+        block = self._block(uid)
+        first, last = start // BLOCK_SIZE, -(-end // BLOCK_SIZE)
+        data = block * (last - first)
+        return data[start - first * BLOCK_SIZE : end - first * BLOCK_SIZE]
+
+    def checksum(self, uid: str) -> str:
+        """MD5 hex digest of the synthetic product `uid`"""
+        md5 = hashlib.md5()
+        block, size = self._block(uid), self.products[uid]
+        for start in range(0, size, BLOCK_SIZE):
+            md5.update(block[: size - start])
+        return md5.hexdigest()
+
+    def search(self, query: dict[str, str]) -> dict:
+        """Answer a catalogue request given its decoded query parameters"""
+        matches = filter(CatalogFilter(query.get("$filter", "")), self.catalog)
+        products = list(matches)
+        if query.get("$orderby", "").endswith("desc"):
+            products.reverse()
+        top = min(int(query.get("$top", DEFAULT_TOP)), MAX_TOP)
+        skip = int(query.get("$skip", 0))
+        page = products[skip : skip + top]
+        if self.product_latency:
+            time.sleep(self.product_latency * len(page))
+        expand = query.get("$expand")
+        names = re.findall(r"Name eq '((?:[^']|'')*)'", expand or "")
+        select = query.get("$select", "").split(",") if "$select" in query else None
+        page = [_project(p, expand, names, select) for p in page]
+        response = {"@odata.context": "$metadata#Products", "value": page}
+        if self.next_links and skip + top < len(products):
+            next_query = {**query, "$skip": str(skip + top)}
+            response["@odata.nextLink"] = (
+                f"{self.url}{CATALOG_PATH}?{urlencode(next_query)}"
+            )
+        return response
+
+    def is_authorized(self, header: str | None) -> bool:
+        token = (header or "").removeprefix("Bearer ")
+        with self._lock:
+            return token in self._access_tokens
+
+    def fails(self, rate: float) -> bool:
+        """Draw whether a request is hit by a failure of the given rate"""
+        if not rate:
+            return False
+        with self._lock:
+            return self._random.random() < rate
+
+    def count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def start(self) -> "MockCDSE":
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.mock = self
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "MockCDSE":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def issue_token(self, form: dict) -> dict | None:
+        """Return a token response for a valid grant, otherwise None"""
+        grant = form.get("grant_type")
+        with self._lock:
+            if grant == "password":
+                if (form.get("username"), form.get("password")) != (
+                    self.username,
+                    self.password,
+                ):
+                    return None
+            elif grant == "refresh_token":
+                if form.get("refresh_token") not in self._refresh_tokens:
+                    return None
+                self._refresh_tokens.discard(form["refresh_token"])
+            else:
+                return None
+            refresh_token = uuid.uuid4().hex
+            access_token = uuid.uuid4().hex
+            self._refresh_tokens.add(refresh_token)
+            self._access_tokens.add(access_token)
+        return {
+            "access_token": access_token,
+            "expires_in": self.token_lifetime,
+            "refresh_token": refresh_token,
+            "refresh_expires_in": self.refresh_lifetime,
+            "token_type": "Bearer",
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def mock(self) -> MockCDSE:
+        return self.server.mock
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def send_json(self, status: int, body: dict) -> None:
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def send_throttled(self, data: bytes) -> None:
+        bandwidth = self.mock.bandwidth
+        for start in range(0, len(data), SEND_SIZE):
+            chunk = data[start : start + SEND_SIZE]
+            self.wfile.write(chunk)
+            if bandwidth:
+                time.sleep(len(chunk) / bandwidth)
+
+    def do_GET(self) -> None:
+        if self.mock.latency:
+            time.sleep(self.mock.latency)
+        url = urlsplit(self.path)
+        product = PRODUCT_PATH.match(url.path)
+        if (url.path == CATALOG_PATH or product) and self.mock.fails(
+            self.mock.failure_rate
+        ):
+            self.mock.count("503")
+            self.send_json(503, {"error": "service unavailable"})
+        elif url.path == CATALOG_PATH:
+            self.mock.count("catalog")
+            query = {k: v[0] for k, v in parse_qs(url.query).items()}
+            self.send_json(200, self.mock.search(query))
+        elif product:
+            self.send_product(product["uid"])
+        else:
+            self.send_json(404, {"error": "not found"})
+
+    def send_product(self, uid: str) -> None:
+        if not self.mock.is_authorized(self.headers.get("Authorization")):
+            self.mock.count("download:unauthorized")
+            self.send_json(401, {"error": "unauthorized"})
+            return
+        if uid not in self.mock.products:
+            self.send_json(404, {"error": "product not found"})
+            return
+        size = self.mock.products[uid]
+        start, end, status = 0, size, 200
+        requested = RANGE.match(self.headers.get("Range", ""))
+        if requested:
+            start = int(requested["start"])
+            end = int(requested["end"]) + 1 if requested["end"] else size
+            end = min(end, size)
+            if start >= size:
+                self.mock.count("download:416")
+                self.send_json(416, {"error": "range not satisfiable"})
+                return
+            status = 206
+        self.mock.count(f"download:{status}")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/zip")
+        self.send_header("Content-Length", str(end - start))
+        self.send_header("Accept-Ranges", "bytes")
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end - 1}/{size}")
+        self.end_headers()
+        data = self.mock.product_bytes(uid, start, end)
+        if self.mock.fails(self.mock.drop_rate):
+            self.mock.count("download:dropped")
+            self.send_throttled(data[: len(data) // 2])
+            self.close_connection = True
+            return
+        self.send_throttled(data)
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length).decode()
+        if self.mock.latency:
+            time.sleep(self.mock.latency)
+        if self.path != "/token":
+            self.send_json(404, {"error": "not found"})
+            return
+        form = {k: v[0] for k, v in parse_qs(body).items()}
+        self.mock.count(f"token:{form.get('grant_type')}")
+        token = self.mock.issue_token(form)
+        if token is None:
+            self.send_json(401, {"error": "invalid_grant"})
+        else:
+            self.send_json(200, token)
@@ -0,0 +1,289 @@
+"""Module providing a persistent SQLite cache of CDSE catalogue results"""
+
+import hashlib
+import json
+import sqlite3
+import time
+import logging as log
+from contextlib import closing
+from pathlib import Path
+from typing import Iterator
+
+from .copernicus_api import PAGE_SIZE, odata_time
+from .exceptions import QueryError
+
+# Query parameters that only select from the cached products of a query
+_WINDOW_PARAMS = ("start_time", "end_time", "orderby", "limit")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS queries (
+    key TEXT PRIMARY KEY,
+    params TEXT NOT NULL,
+    start_time TEXT NOT NULL,
+    end_time TEXT NOT NULL,
+    high_water TEXT,
+    fetched_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS products (
+    key TEXT NOT NULL,
+    id TEXT NOT NULL,
+    content_start TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (key, id)
+);
+CREATE INDEX IF NOT EXISTS products_start ON products (key, content_start);
+CREATE TABLE IF NOT EXISTS windows (
+    key TEXT NOT NULL,
+    start_time TEXT NOT NULL,
+    end_time TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS windows_key ON windows (key);
+"""
+
+
+def _merge(windows: list[tuple[str, str]]) -> list[tuple[str, str]]:
+    """Merge overlapping or touching time windows"""
+    merged = []
+    for start, end in sorted(windows):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(end, merged[-1][1]))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _gaps(
+    windows: list[tuple[str, str]], start: str, end: str
+) -> list[tuple[str, str]]:
+    """Parts of the window from `start` to `end` not covered by `windows`"""
+    gaps = []
+    for covered_start, covered_end in _merge(windows):
+        if covered_start > start:
+            gaps.append((start, min(covered_start, end)))
+        start = max(start, covered_end)
+        if start >= end:
+            return gaps
+    return gaps + [(start, end)]
+
+
+class CatalogCache:
+    """On-disk cache of catalogue query results.
+
+    Queries are keyed by mission and all query parameters except the time
+    window, `orderby` and `limit`. Each cache entry covers a set of fetched
+    time windows:
+
+    * queries inside fresh cached windows are answered from the cache,
+    * when the window has grown past the cached ones or the entry is older
+      than `ttl`, only products newer than the cached high-water mark of
+      `ContentDate/Start` are fetched,
+    * parts of the query window that were never fetched, e.g. before the
+      cached windows or after a failed sub-window of a split query, are
+      fetched on their own.
+
+    Parameters
+    ----------
+    path : Path | str
+        SQLite database file
+    ttl : float, optional
+        Seconds after which a cached window is refreshed
+    """
+
+    def __init__(self, path: Path | str, ttl: float = 3600) -> None:
+        self.path = Path(path)
+        self.ttl = ttl
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as db:
+            # Readers don't block the writer and vice versa
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def key(mission: str, params: dict) -> str:
+        """Cache key of the normalized query parameters"""
+        normalized = {
+            name: " ".join(value.split()) if isinstance(value, str) else value
+            for name, value in params.items()
+            if name not in _WINDOW_PARAMS and value is not None
+        }
+        normalized["mission"] = mission
+        return hashlib.sha1(json.dumps(normalized, sort_keys=True).encode()).hexdigest()
+
+    def pages(
+        self,
+        api,
+        params: dict,
+        page_size: int = PAGE_SIZE,
+        offline: bool = False,
+    ) -> Iterator[list[dict]]:
+        """Return an iterator over the raw products of a query in pages,
+        refreshing the cache from the catalogue first where needed.
+
+        Parameters:
+        api : CopernicusDataspaceAPI
+            Client used to fetch missing products
+        params : dict
+            Query parameters as passed to `_build_query`
+        page_size : int, optional
+            Number of products per yielded page
+        offline : bool, optional
+            Never contact the catalogue, raise QueryError if the query is
+            not cached
+        """
+        try:
+            yield from self._pages(api, params, page_size, offline)
+        except sqlite3.Error as e:
+            raise QueryError(f"Catalog cache {self.path} failed: {e}")
+
+    def _pages(
+        self, api, params: dict, page_size: int, offline: bool
+    ) -> Iterator[list[dict]]:
+        key = self.key(api.mission, params)
+        start, end = odata_time(params["start_time"]), odata_time(params["end_time"])
+        entry = self._entry(key)
+
+        if offline:
+            if entry is None:
+                raise QueryError(f"Query is not cached in {self.path}: {params}")
+        elif entry is None:
+            self._fetch(api, key, params, start, end)
+        else:
+            with closing(self._connect()) as db:
+                windows = self._windows(db, key)
+            # Backfill what the cached windows miss up to their end
+            for gap in _gaps(windows, start, min(end, entry["end_time"])):
+                self._fetch(api, key, params, *gap, fresh=False)
+            if end > entry["end_time"] or time.time() - entry["fetched_at"] > self.ttl:
+                since = entry["high_water"] or entry["start_time"]
+                self._fetch(api, key, params, since, max(end, entry["end_time"]))
+        yield from self._select(
+            key, start, end, params.get("orderby"), params.get("limit"), page_size
+        )
+
+    def contains(self, mission: str, params: dict) -> bool:
+        """Check whether a query of `mission` with `params` is cached."""
+        return self._entry(self.key(mission, params)) is not None
+
+    def clear(self) -> None:
+        """Remove all cached queries and products."""
+        with closing(self._connect()) as db, db:
+            db.execute("DELETE FROM queries")
+            db.execute("DELETE FROM products")
+            db.execute("DELETE FROM windows")
+
+    def _entry(self, key: str) -> dict | None:
+        with closing(self._connect()) as db:
+            db.row_factory = sqlite3.Row
+            row = db.execute("SELECT * FROM queries WHERE key = ?", (key,)).fetchone()
+        return dict(row) if row else None
+
+    @staticmethod
+    def _windows(db: sqlite3.Connection, key: str) -> list[tuple[str, str]]:
+        """Fetched time windows of a query, merged and sorted"""
+        windows = db.execute(
+            "SELECT start_time, end_time FROM windows WHERE key = ?", (key,)
+        ).fetchall()
+        if not windows:
+            # Entries cached before windows were tracked cover one window
+            windows = db.execute(
+                "SELECT start_time, end_time FROM queries WHERE key = ?", (key,)
+            ).fetchall()
+        return _merge(windows)
+
+    def _fetch(
+        self,
+        api,
+        key: str,
+        params: dict,
+        start: str,
+        end: str,
+        fresh: bool = True,
+    ) -> None:
+        """Fetch the products of `params` between `start` and `end`, store
+        them and add the window to the cached ones. `fresh` marks the products after
+        the high-water mark as up to date.
+
+        No transaction is open while a page is fetched, every page is written
+        in its own short transaction and the window in a final one, so
+        concurrent queries only wait for each other's writes."""
+        log.info(f"Refreshing catalog cache for {api.mission} from {start} to {end}")
+        fetch_params = {
+            **params,
+            "start_time": start,
+            "end_time": end,
+            "orderby": None,
+            "limit": None,
+        }
+        with closing(self._connect()) as db:
+            for values in api._fetch_pages(**fetch_params):
+                with db:
+                    db.executemany(
+                        "INSERT OR REPLACE INTO products VALUES (?, ?, ?, ?)",
+                        [
+                            (
+                                key,
+                                prod["Id"],
+                                prod["ContentDate"]["Start"],
+                                json.dumps(prod),
+                            )
+                            for prod in values
+                        ],
+                    )
+            with db:
+                # Take the write lock before reading the entry it updates
+                db.execute("BEGIN IMMEDIATE")
+                high_water = db.execute(
+                    "SELECT MAX(content_start) FROM products WHERE key = ?", (key,)
+                ).fetchone()[0]
+                entry = db.execute(
+                    "SELECT fetched_at FROM queries WHERE key = ?", (key,)
+                ).fetchone()
+                # Only windows that were fetched completely are recorded, so
+                # the gaps left by failed fetches are fetched again
+                windows = _merge(self._windows(db, key) + [(start, end)])
+                db.execute("DELETE FROM windows WHERE key = ?", (key,))
+                db.executemany(
+                    "INSERT INTO windows VALUES (?, ?, ?)",
+                    [(key, *window) for window in windows],
+                )
+                start, end = windows[0][0], windows[-1][1]
+                fetched_at = time.time() if fresh or not entry else entry[0]
+                db.execute(
+                    "INSERT OR REPLACE INTO queries VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        key,
+                        json.dumps(
+                            {k: params[k] for k in params if k not in _WINDOW_PARAMS}
+                        ),
+                        start,
+                        end,
+                        high_water,
+                        fetched_at,
+                    ),
+                )
+
+    def _select(
+        self,
+        key: str,
+        start: str,
+        end: str,
+        orderby: str | None,
+        limit: int | None,
+        page_size: int,
+    ) -> Iterator[list[dict]]:
+        query = (
+            "SELECT data FROM products WHERE key = ?"
+            " AND content_start > ? AND content_start < ?"
+            f" ORDER BY content_start {'DESC' if orderby == 'desc' else 'ASC'}"
+        )
+        args: tuple = (key, start, end)
+        if limit:
+            query += " LIMIT ?"
+            args += (limit,)
+        with closing(self._connect()) as db:
+            cursor = db.execute(query, args)
+            while rows := cursor.fetchmany(page_size):
+                yield [json.loads(data) for (data,) in rows]
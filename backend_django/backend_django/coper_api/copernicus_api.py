@@ -6,20 +6,35 @@ from concurrent.futures import ThreadPoolExecutor
 from multiprocessing import cpu_count
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Literal
+from typing import TYPE_CHECKING, Iterator, Literal
 from tqdm import tqdm
 import logging as log
+import hashlib
+import json
+import os
+import threading
 import pandas as pd
 import requests
 
+from . import geo_utils
+from .auth import TokenManager
+from .extract import ZipStreamExtractor
+from .json_stream import ODataStream
+from .session import RequestStats, create_session, grow_pool
 from .exceptions import (
     AttributeNotFoundError,
-    AuthorizationError,
+    ChecksumError,
     FilterByAttributeError,
     DownloadError,
+    ExtractionError,
     QueryError,
 )
 
+if TYPE_CHECKING:
+    from .async_download import DownloadReport
+    from .catalog_cache import CatalogCache
+    from .product_store import ProductStore
+
 
 log.basicConfig(
     level=log.INFO,
@@ -33,6 +48,39 @@ CATALOG_URL = (
 )
 TOKEN_URL = "https://identity.dataspace.copernicus.eu/auth/realms/CDSE/protocol/openid-connect/token"
 DOWNLOAD_URL = "https://zipper.dataspace.copernicus.eu/odata/v1/Products"
+# Maximum number of products the catalogue returns in a single response
+PAGE_SIZE = 1000
+# Products per DataFrame chunk and bytes per socket read of streamed queries
+STREAM_CHUNK_ROWS = 250
+STREAM_READ_SIZE = 64 * 1024
+# Size of streamed download chunks and of blocks read for checksums
+CHUNK_SIZE = 1024 * 1024
+HASH_BLOCK_SIZE = 8 * 1024 * 1024
+# Product fields always fetched by queries with a column projection
+REQUIRED_COLUMNS = ("Id", "Name", "ContentDate")
+# Product fields holding timestamps
+DATE_COLUMNS = ("OriginDate", "PublicationDate", "ModificationDate", "EvictionDate")
+# Minimum product size for segmented downloads
+SEGMENT_THRESHOLD = 512 * 1024 * 1024
+# Attribute value types expanded to float64 columns
+NUMERIC_VALUE_TYPES = ("Double", "Integer")
+# Catalogue value types of the attributes that can be filtered on the server,
+# filters on other attributes are applied locally
+ATTRIBUTE_VALUE_TYPES = {
+    "cloudCover": "Double",
+    "orbitNumber": "Integer",
+    "relativeOrbitNumber": "Integer",
+    "orbitDirection": "String",
+    "productType": "String",
+    "processingLevel": "String",
+    "platformSerialIdentifier": "String",
+    "instrumentShortName": "String",
+    "operationalMode": "String",
+    "polarisationChannels": "String",
+    "swathIdentifier": "String",
+    "tileId": "String",
+    "timeliness": "String",
+}
 
 
 class CopernicusDataspaceAPI(ABC):
@@ -51,15 +99,58 @@ class CopernicusDataspaceAPI(ABC):
         SENTINEL-3
         SENTINEL-5P
         SENTINEL-6
+    token_url : string, optional
+        OpenID Connect token endpoint of the identity server
+    catalog_url : string, optional
+        OData product search URL, up to the collection filter
+    download_url : string, optional
+        Base URL of the product download service
+    pool_size : int, optional
+        Number of keep-alive connections per host. `download_all` grows the
+        pool to its thread count.
+    retries : int, optional
+        Number of retries for connection errors and 429/5xx responses
+    backoff_factor : float, optional
+        Exponential backoff factor between retries, `Retry-After` headers
+        take precedence
+    catalog_cache : CatalogCache, optional
+        Local cache of query results
+    product_store : ProductStore, optional
+        Quota-bounded store consulted and filled by `download_all`
     """
 
     def __init__(
         self,
         username: str,
         password: str,
+        token_url: str = TOKEN_URL,
+        catalog_url: str = CATALOG_URL,
+        download_url: str = DOWNLOAD_URL,
+        pool_size: int = 4,
+        retries: int = 5,
+        backoff_factor: float = 1.0,
+        catalog_cache: "CatalogCache | None" = None,
+        product_store: "ProductStore | None" = None,
     ) -> None:
         self.username = username
         self.password = password
+        self.catalog_url = catalog_url
+        self.download_url = download_url
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.catalog_cache = catalog_cache
+        self.product_store = product_store
+        # Latency, retry and connection counts of all requests, see
+        # `RequestStats.summary`
+        self.http_stats = RequestStats()
+        self.session = create_session(
+            pool_size, retries, backoff_factor, self.http_stats
+        )
+        # Shared by all download threads, so a token is requested only when
+        # the cached one is about to expire
+        self.token_manager = TokenManager(
+            username, password, token_url, session=self.session
+        )
 
     @property
     @abstractmethod
@@ -74,30 +165,273 @@ class CopernicusDataspaceAPI(ABC):
         raise NotImplementedError
 
     def _get_access_token(self) -> str:
-        data = {
-            "client_id": "cdse-public",
-            "username": self.username,
-            "password": self.password,
-            "grant_type": "password",
-        }
+        return self.token_manager.get_token()
+
+    @property
+    def pool_size(self) -> int:
+        """Keep-alive connections per host of the (shared) session"""
+        return self.session.pool_size
+
+    def _resize_pool(self, pool_size: int) -> None:
+        """Grow the connection pool to serve `pool_size` concurrent requests.
+
+        The size is kept on the session, so clients sharing it through
+        `for_mission` never shrink each other's pool."""
+        grow_pool(
+            self.session,
+            pool_size,
+            self.retries,
+            self.backoff_factor,
+            self.http_stats,
+        )
+
+    def _get_page(self, url: str) -> dict:
+        """Send a single catalogue request and return the decoded response."""
         try:
-            r = requests.post(TOKEN_URL, data=data, timeout=100)
-            r.raise_for_status()
+            response = self.session.get(url, timeout=100)
+            response.raise_for_status()
+            return response.json()
         except Exception as e:
-            raise AuthorizationError(
-                f"Access token creation failed. Error: {e} \n"
-                f"\tMake sure your login credentials are correct for"
-                " https://dataspace.copernicus.eu/"
+            raise QueryError(f"{e.__class__.__name__}: Query failed: {e.args[0]}")
+
+    def _fetch_pages(
+        self,
+        *,
+        start_time: str,
+        end_time: str,
+        prod_type: str | None = None,
+        exclude: str | None = None,
+        footprint: str | None = None,
+        orderby: str | None = None,
+        limit: int | None = None,
+        attribute_filters: dict[str, list] | None = None,
+        columns: list[str] | None = None,
+        attributes: list[str] | None = None,
+        page_size: int = PAGE_SIZE,
+        stream: bool = False,
+        chunk_rows: int = STREAM_CHUNK_ROWS,
+    ) -> Iterator[list[dict]]:
+        """Yield the raw products of each catalogue result page.
+
+        Pages are followed through `@odata.nextLink` when the server provides
+        it, otherwise through `$skip`. The next page is requested in the
+        background while the current one is being processed.
+
+        With `stream`, each page is parsed incrementally while it is received
+        and yielded in chunks of `chunk_rows` products instead, so neither the
+        response body nor a whole page of products is held in memory.
+        """
+        page_size = min(page_size, PAGE_SIZE)
+        remaining = limit
+        skip = 0
+
+        def next_url(skip: int) -> str:
+            top = page_size if remaining is None else min(page_size, remaining)
+            return self._build_query(
+                start_time=start_time,
+                end_time=end_time,
+                prod_type=prod_type,
+                exclude=exclude,
+                footprint=footprint,
+                orderby=orderby,
+                limit=top,
+                skip=skip,
+                attribute_filters=attribute_filters,
+                columns=columns,
+                attributes=attributes,
             )
-        return r.json()["access_token"]
 
-    @staticmethod
-    def __add_attrs_to_df(product: pd.Series) -> pd.Series:
-        "Extracts Sentinel product attributes and add to the DataFrame"
-        attributes = product.get("Attributes", [])
-        for attr in attributes:
-            product[attr["Name"]] = attr["Value"]
-        return product
+        def follow_page(page: dict, received: int) -> str | None:
+            """URL of the page after one with `received` products"""
+            link = page.get("@odata.nextLink")
+            # The link repeats the page's `$top`, the last page of a limited
+            # query asks for the remaining products only
+            if link and (remaining is None or remaining >= page_size):
+                return link
+            if link or received == page_size:
+                return next_url(skip)
+            return None
+
+        if stream:
+            url = next_url(skip)
+            while url:
+                received, metadata = 0, {}
+                try:
+                    with self.session.get(url, stream=True, timeout=100) as response:
+                        response.raise_for_status()
+                        # iter_content transparently decompresses gzip bodies
+                        parsed = ODataStream(response.iter_content(STREAM_READ_SIZE))
+                        chunk = []
+                        for product in parsed:
+                            chunk.append(product)
+                            received += 1
+                            if len(chunk) == chunk_rows:
+                                yield chunk
+                                chunk = []
+                            # The rest of the page is beyond the limit
+                            if received == remaining:
+                                break
+                        if chunk:
+                            yield chunk
+                        metadata = parsed.metadata
+                except (requests.exceptions.RequestException, ValueError) as e:
+                    raise QueryError(
+                        f"{e.__class__.__name__}: Query failed: {e.args[0]}"
+                    )
+                skip += received
+                if remaining is not None:
+                    remaining -= received
+                url = None
+                if received and (remaining is None or remaining > 0):
+                    url = follow_page(metadata, received)
+            return
+
+        with ThreadPoolExecutor(1) as executor:
+            pending = executor.submit(self._get_page, next_url(skip))
+            while pending is not None:
+                json = pending.result()
+                pending = None
+                values = json.get("value", [])
+                if remaining is not None:
+                    values = values[:remaining]
+                    remaining -= len(values)
+                skip += len(values)
+
+                # Prefetch the next page before handing out the current one
+                if values and (remaining is None or remaining > 0):
+                    url = follow_page(json, len(values))
+                    if url:
+                        pending = executor.submit(self._get_page, url)
+                yield values
+
+    def query_iter(
+        self,
+        *,
+        start_time: str,
+        end_time: str,
+        prod_type: str | None = None,
+        exclude: str | None = None,
+        footprint: str | None = None,
+        orderby: Literal["asc", "desc"] | None = None,
+        limit: int | None = None,
+        page_size: int = PAGE_SIZE,
+        offline: bool = False,
+        pushdown: bool = True,
+        columns: list[str] | None = None,
+        attributes: list[str] | None = None,
+        stream: bool = False,
+        chunk_rows: int = STREAM_CHUNK_ROWS,
+        **kwargs: list[int] | list[float] | list[str],
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Query Copernicus DataSpace API page by page, yielding products as they
+        arrive.
+
+        Only one result page is held in memory at a time. When the API was
+        created with a `catalog_cache`, products are served from and stored
+        in the cache.
+
+        Parameters:
+        start_time, end_time, prod_type, exclude, footprint, orderby, limit,
+        **kwargs
+            Same as for `query`.
+        page_size : int, optional
+            Number of products requested per page (`$top`). The catalogue
+            does not return more than 1000 products per page.
+        offline : bool, optional
+            Answer from the catalog cache only, without network requests.
+        pushdown, columns, attributes : optional
+            Same as for `query`.
+        stream : bool, optional
+            Parse responses incrementally while they are received and yield
+            chunks of `chunk_rows` products. Lowers peak memory at the cost of
+            the background prefetch of the next page.
+        chunk_rows : int, optional
+            Number of products per yielded chunk when streaming.
+
+        Yields : pd.DataFrame
+            Non-empty DataFrame chunks containing the products of each page.
+        """
+        if columns is not None:
+            columns = list(dict.fromkeys([*REQUIRED_COLUMNS, *columns]))
+
+        def build_params(server_filters: dict, local_filters: dict) -> dict:
+            return dict(
+                start_time=start_time,
+                end_time=end_time,
+                prod_type=prod_type,
+                exclude=exclude,
+                footprint=footprint,
+                orderby=orderby,
+                limit=limit,
+                attribute_filters=server_filters or None,
+                columns=columns,
+                # Attributes filtered locally have to be fetched
+                attributes=(
+                    None
+                    if attributes is None
+                    else list(dict.fromkeys([*attributes, *local_filters]))
+                ),
+            )
+
+        server_filters, local_filters = {}, kwargs
+        if pushdown:
+            server_filters, local_filters = split_attribute_filters(kwargs)
+        params = build_params(server_filters, local_filters)
+        if (
+            offline
+            and server_filters
+            and self.catalog_cache is not None
+            and not self.catalog_cache.contains(self.mission, params)
+        ):
+            # Filter the cached products of the unfiltered query locally
+            server_filters, local_filters = {}, kwargs
+            params = build_params(server_filters, local_filters)
+        attributes = params["attributes"]
+        if self.catalog_cache is not None:
+            pages = self.catalog_cache.pages(
+                self, params, page_size=page_size, offline=offline
+            )
+        elif offline:
+            raise QueryError("Offline queries require a catalog cache")
+        else:
+            pages = self._fetch_pages(
+                **params, page_size=page_size, stream=stream, chunk_rows=chunk_rows
+            )
+
+        first_page = True
+        for values in pages:
+            # convert dict into pd.Dataframe
+            products = pd.DataFrame.from_dict(values)
+
+            # Suggest product types if the query result is empty
+            if first_page and products.empty and prod_type:
+                if not any(prod_type in prod for prod in self.prod_types):
+                    log.info(
+                        "No product found. Use product types available "
+                        + f"for {self.mission} mission: {self.prod_types}"
+                    )
+            first_page = False
+            if products.empty:
+                continue
+
+            # Extract more Attributes and add as new fields in DataFram
+            products = expand_attributes(products, names=attributes)
+            # Apply product specific attribute filter the server can't apply
+            if local_filters:
+                try:
+                    products = filter_by_attributes(
+                        products, **local_filters
+                    ).reset_index(drop=True)
+                except Exception as e:
+                    raise FilterByAttributeError(
+                        f"{type(e).__name__} occured while filtering query "
+                        f"results by attributes: {e}"
+                    )
+            if columns is not None:
+                products = compact_products(products)
+            if not products.empty:
+                yield products
 
     def query(
         self,
@@ -109,16 +443,31 @@ class CopernicusDataspaceAPI(ABC):
         footprint: str | None = None,
         orderby: Literal["asc", "desc"] | None = None,
         limit: int | None = None,
+        offline: bool = False,
+        split: Literal["day", "week"] | int | None = None,
+        split_workers: int = 4,
+        tile: float | None = None,
+        pushdown: bool = True,
+        columns: list[str] | None = None,
+        attributes: list[str] | None = None,
+        stream: bool = False,
         **kwargs: list[int] | list[float] | list[str],
     ) -> pd.DataFrame:
         """
         Query Copernicus DataSpace API for products matching specified criteria.
 
+        All result pages are fetched with `query_iter` and concatenated. With
+        `split`, the time window is divided into sub-windows that are queried
+        concurrently, then merged, de-duplicated by `Id` and sorted. With
+        `tile`, a large `footprint` is likewise queried tile by tile.
+
         Parameters:
         start_time : str
-            Start time of the query period in '%Y-%m-%d' format.
+            Start time of the query period in '%Y-%m-%d' format, or as a full
+            ISO 8601 UTC timestamp.
         end_time : str
-            End time of the query period in '%Y-%m-%d' format.
+            End time of the query period in '%Y-%m-%d' format, or as a full
+            ISO 8601 UTC timestamp.
         prod_type : str, optional
             Keyword for product type match in the prod name. Must be one of the
             supported product types. To check the available options call
@@ -133,6 +482,28 @@ class CopernicusDataspaceAPI(ABC):
             Sort order by acquizition time.
         limit : int, optional
             Maximum number of products to return.
+        offline : bool, optional
+            Answer from the catalog cache only, without network requests.
+        split : Literal {'day', 'week'} | int, optional
+            Split the time window into daily or weekly sub-windows, or into
+            the given number of equal sub-windows.
+        split_workers : int, optional
+            Maximum number of sub-window or tile queries running concurrently.
+        tile : float, optional
+            Split `footprint` into tiles of this size in degrees, see
+            `geo_utils.tile_geometry`.
+        pushdown : bool, optional
+            Filter by attributes on the server where possible, see
+            `split_attribute_filters`. Other filters are applied locally.
+        columns : list[str], optional
+            Product fields to fetch (`$select`). `Id`, `Name` and
+            `ContentDate` are always included. The result is made compact
+            with `compact_products`.
+        attributes : list[str], optional
+            Product attributes to fetch and expand, all by default. An empty
+            list skips attributes entirely.
+        stream : bool, optional
+            Parse catalogue responses incrementally, see `query_iter`.
         **kwargs : Mapping[str, Union[List[int], List[float], List[str]]]
             Additional filters based on product sepcific attributes.
             Each key should be an attribute name, and the corresponding value
@@ -142,49 +513,161 @@ class CopernicusDataspaceAPI(ABC):
             DataFrame containing the resulting products of the query.
         """
 
-        # Building query string
-        query_str = self._build_query(
-            start_time=start_time,
-            end_time=end_time,
-            prod_type=prod_type,
-            exclude=exclude,
-            footprint=footprint,
-            orderby=orderby,
-            limit=limit,
+        def run(window: tuple[str, str], footprint: str | None) -> pd.DataFrame:
+            chunks = self.query_iter(
+                start_time=window[0],
+                end_time=window[1],
+                prod_type=prod_type,
+                exclude=exclude,
+                footprint=footprint,
+                orderby=orderby,
+                limit=limit,
+                offline=offline,
+                pushdown=pushdown,
+                columns=columns,
+                attributes=attributes,
+                stream=stream,
+                **kwargs,
+            )
+            return concat_products(list(chunks))
+
+        footprints = [footprint]
+        if tile and footprint:
+            # Points and lines have no areal tiles, query them untiled
+            tiles = geo_utils.tile_geometry(footprint, tile)
+            footprints = [geom.wkt for geom in tiles] or [footprint]
+        if not split and len(footprints) == 1:
+            return run((start_time, end_time), footprints[0])
+
+        windows = (
+            split_time_window(start_time, end_time, split)
+            if split
+            else [(start_time, end_time)]
         )
+        jobs = [(window, area) for window in windows for area in footprints]
+        workers = max(1, min(split_workers, len(jobs)))
+        self._resize_pool(workers)
+        with ThreadPoolExecutor(workers) as executor:
+            products = concat_products(list(executor.map(lambda job: run(*job), jobs)))
+        if products.empty:
+            return products
+        # Sub-windows and tiles overlap at their boundaries
+        products = products.drop_duplicates("Id")
+        if orderby:
+            start = content_start(products)
+            order = start.sort_values(ascending=orderby == "asc", kind="stable")
+            products = products.loc[order.index]
+        if limit:
+            products = products.head(limit)
+        return products.reset_index(drop=True)
 
-        # Send query
+    def for_mission(self, mission: str) -> "CopernicusDataspaceAPI":
+        """Client for another mission sharing this client's session, token,
+        statistics, catalog cache and product store.
+
+        Parameters:
+        mission : str
+            Mission name, one of `MISSION_APIS`
+
+        Returns : CopernicusDataspaceAPI
+            Client of the mission's subclass
+        """
+        if mission == self.mission:
+            return self
         try:
-            json = requests.get(query_str, timeout=100).json()
-        except Exception as e:
-            raise QueryError(f"{e.__class__.__name__}: Query failed: {e.args[0]}")
+            cls = MISSION_APIS[mission]
+        except KeyError:
+            raise QueryError(
+                f"Unknown mission {mission}, expected one of {list(MISSION_APIS)}"
+            )
+        api = cls.__new__(cls)
+        api.__dict__.update(self.__dict__)
+        return api
 
-        # convert dict into pd.Dataframe
-        products = pd.DataFrame.from_dict(json["value"])
+    def query_missions(
+        self,
+        missions: list[str] | dict[str, dict],
+        *,
+        workers: int | None = None,
+        **kwargs,
+    ) -> pd.DataFrame:
+        """Query several missions concurrently over one session and token.
 
-        # Suggest product types if the query result is empty
-        if products.empty and prod_type:
-            if not any(prod_type in prod for prod in self.prod_types):
-                log.info(
-                    "No product found. Use product types available "
-                    + f"for {self.mission} mission: {self.prod_types}"
-                )
-                return products
-        # Extract more Attributes and add as new fields in DataFram
-        products = products.apply(self.__add_attrs_to_df, axis=1)
-        # Apply product specific attribute filter
-        if kwargs:
-            try:
-                products = filter_by_attributes(products, **kwargs).reset_index(
-                    drop=True
-                )
-            except Exception as e:
-                raise FilterByAttributeError(
-                    f"{type(e).__name__} occured while filtering query results "
-                    f"by attributes: {e}"
-                )
+        Parameters:
+        missions : list[str] | dict[str, dict]
+            Mission names, or a mapping of mission names to `query` arguments
+            specific to that mission, e.g. `{"SENTINEL-2": {"prod_type":
+            "L2A"}, "SENTINEL-5P": {"prod_type": "L2__NO2"}}`
+        workers : int, optional
+            Maximum number of missions queried at once, all by default
+        **kwargs
+            `query` arguments shared by all missions, e.g. `start_time`,
+            `end_time` and `footprint`
+
+        Returns : pd.DataFrame
+            Products of all missions, tagged in a leading `Mission` column
+        """
+        if not isinstance(missions, dict):
+            missions = {mission: {} for mission in missions}
+        if not missions:
+            return pd.DataFrame()
+        apis = {mission: self.for_mission(mission) for mission in missions}
+
+        def run(mission: str) -> pd.DataFrame:
+            products = apis[mission].query(**{**kwargs, **missions[mission]})
+            products.insert(0, "Mission", mission)
+            return products
+
+        workers = min(workers or len(missions), len(missions))
+        self._resize_pool(workers * kwargs.get("split_workers", 1))
+        with ThreadPoolExecutor(workers) as executor:
+            chunks = list(executor.map(run, missions))
+        products = concat_products(chunks)
+        products["Mission"] = products["Mission"].astype(
+            pd.CategoricalDtype(list(missions))
+        )
         return products
 
+    @staticmethod
+    def products_intersecting(products: pd.DataFrame, aoi: str) -> pd.DataFrame:
+        """Filter query results locally to the products whose footprint
+        intersects `aoi`, instead of sending a new query per AOI.
+
+        Footprints are parsed into an STRtree on the first call for a
+        DataFrame and reused for all further AOIs.
+
+        Parameters:
+        products : pd.DataFrame
+            Products as returned by `query`
+        aoi : str
+            Well-Known Text of the area of interest in EPSG 4326
+
+        Returns : pd.DataFrame
+            Products intersecting the AOI
+        """
+        return geo_utils.products_intersecting(products, aoi)
+
+    @staticmethod
+    def covering_products(
+        products: pd.DataFrame, aoi: str, coverage: float = 0.999
+    ) -> pd.DataFrame:
+        """Plan downloads for an AOI: select a near-minimal set of products
+        covering `aoi`, preferring low `cloudCover` and recent acquisitions.
+        See `geo_utils.covering_products`.
+
+        Parameters:
+        products : pd.DataFrame
+            Products as returned by `query`
+        aoi : str
+            Well-Known Text of the area of interest in EPSG 4326
+        coverage : float, optional
+            Fraction of the AOI area that has to be covered
+
+        Returns : pd.DataFrame
+            Subset of products to pass to `download_all`
+        """
+        return geo_utils.covering_products(products, aoi, coverage=coverage)
+
     def _build_query(
         self,
         start_time: str,
@@ -194,6 +677,10 @@ class CopernicusDataspaceAPI(ABC):
         footprint: str | None = None,
         orderby: str | None = None,
         limit: int | None = None,
+        skip: int | None = None,
+        attribute_filters: dict[str, list] | None = None,
+        columns: list[str] | None = None,
+        attributes: list[str] | None = None,
     ) -> str:
         """Builds the API product request string based on given properties and
         constraints.
@@ -203,9 +690,9 @@ class CopernicusDataspaceAPI(ABC):
         """
 
         query_str = (
-            f"{CATALOG_URL}/Name eq '{self.mission}'"
-            + f" and ContentDate/Start gt {start_time}T00:00:00.000Z"
-            + f" and ContentDate/Start lt {end_time}T00:00:00.000Z"
+            f"{self.catalog_url}/Name eq '{self.mission}'"
+            + f" and ContentDate/Start gt {odata_time(start_time)}"
+            + f" and ContentDate/Start lt {odata_time(end_time)}"
         )
         if prod_type:
             query_str += f" and contains(Name, '{prod_type}')"
@@ -215,59 +702,342 @@ class CopernicusDataspaceAPI(ABC):
             query_str += (
                 f" and OData.CSC.Intersects(area=geography'SRID=4326;{footprint}')"
             )
+        for name, values in (attribute_filters or {}).items():
+            query_str += f" and {attribute_filter_clause(name, values)}"
         if orderby:
             query_str += f"&$orderby=ContentDate/Start {orderby}"
         if limit:
             query_str += f"&$top={limit}"
-        query_str += "&$expand=Attributes"
+        if skip:
+            query_str += f"&$skip={skip}"
+        if columns:
+            query_str += f"&$select={','.join(columns)}"
+        if attributes is None:
+            query_str += "&$expand=Attributes"
+        elif attributes:
+            names = " or ".join(f"Name eq {_odata_literal(a)}" for a in attributes)
+            query_str += f"&$expand=Attributes($filter={names})"
         return query_str
 
-    def download_by_id(self, uid: str, out_path: Path) -> None:
+    def download_by_id(
+        self,
+        uid: str,
+        out_path: Path,
+        *,
+        content_length: int | None = None,
+        checksum: str | None = None,
+        segments: int = 1,
+        segment_threshold: int = SEGMENT_THRESHOLD,
+    ) -> Path:
         """Download single products by UIDs.
 
+        The product is written to `<out_path>.zip.part` and renamed to
+        `<out_path>.zip` once complete. An existing `.part` file is resumed
+        with an HTTP `Range` request, and interrupted transfers are resumed
+        up to `retries` times.
+
+        Products of at least `segment_threshold` bytes can be fetched in
+        `segments` byte ranges concurrently, see `_download_segmented`.
+
         Parameters:
         uid : str
             UID of the product to be downloaded
         out_path : Path
             Output file path for downloaded product
+        content_length : int, optional
+            Expected size in bytes, the catalogue's `ContentLength`
+        checksum : str, optional
+            Expected MD5 hex digest, see `product_checksum`
+        segments : int, optional
+            Number of byte ranges downloaded concurrently, requires
+            `content_length`
+        segment_threshold : int, optional
+            Minimum product size in bytes for a segmented download
+
+        Returns : Path
+            Path of the downloaded product
         """
+        out_file = Path(str(out_path) + ".zip")
+        part_file = Path(str(out_file) + ".part")
+        url = f"{self.download_url}({uid})/$value"
+
+        segmented = (
+            segments > 1
+            and content_length is not None
+            and content_length >= segment_threshold
+        )
+        # Keep resuming a .part file in the mode it was started with, a
+        # segmented one is preallocated and can't be resumed by its size
+        if part_file.exists():
+            segmented = _progress_file(part_file).exists()
+            if segmented and content_length is None:
+                log.info(f"Discarding {part_file.name} of unknown size")
+                part_file.unlink()
+                _progress_file(part_file).unlink()
+                segmented = False
+        if segmented:
+            self._resize_pool(segments)
+            self._download_segmented(url, part_file, content_length, segments)
+        else:
+            self._download_stream(url, part_file, content_length)
 
-        access_token = self._get_access_token()
-        headers = {"Authorization": f"Bearer {access_token}"}
+        self._verify_download(part_file, content_length, checksum)
+        os.replace(part_file, out_file)
+        return out_file
 
-        url = f"{DOWNLOAD_URL}({uid})/$value"
+    def extract_by_id(
+        self,
+        uid: str,
+        out_dir: Path | str | None = None,
+        *,
+        patterns: list[str] | None = None,
+        bands: list[str] | None = None,
+        flatten: bool = False,
+    ) -> dict[str, Path | bytes]:
+        """Extract selected members of a product while it is downloaded,
+        without storing the archive.
 
-        session = requests.Session()
-        session.headers.update(headers)
-        response = session.get(url, headers=headers, stream=True)
+        Interrupted transfers are resumed with an HTTP `Range` request up to
+        `retries` times.
 
-        try:
-            with open(str(out_path) + ".zip", "wb") as file:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        file.write(chunk)
-        except Exception as e:
-            raise DownloadError(f"Failed to download {out_path.name}\n{e}")
+        Parameters:
+        uid : str
+            UID of the product
+        out_dir : Path | str, optional
+            Directory the members are written to. Without it, member
+            contents are returned in memory.
+        patterns : list[str], optional
+            Glob patterns of the member paths, e.g. `"*.nc"`
+        bands : list[str], optional
+            Band names in the member file names, e.g. `["B04", "B08"]`
+        flatten : bool, optional
+            Write members directly into `out_dir` instead of their archive
+            path
+
+        Returns : dict[str, Path | bytes]
+            Extracted file path, or content, by member name
+        """
+        url = f"{self.download_url}({uid})/$value"
+        extractor = ZipStreamExtractor(
+            out_dir, patterns=patterns, bands=bands, flatten=flatten
+        )
+        for attempt in range(self.retries + 1):
+            headers = {"Authorization": f"Bearer {self._get_access_token()}"}
+            if extractor.offset:
+                headers["Range"] = f"bytes={extractor.offset}-"
+            try:
+                with self.session.get(url, headers=headers, stream=True) as response:
+                    if response.status_code == 401:
+                        self.token_manager.invalidate()
+                    response.raise_for_status()
+                    if extractor.offset and response.status_code != 206:
+                        raise DownloadError(
+                            f"Server does not support range requests for {uid}"
+                        )
+                    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                        extractor.feed(chunk)
+                        # Skip the central directory, it is not needed
+                        if extractor.done:
+                            break
+                return extractor.close()
+            except requests.exceptions.RequestException as e:
+                status = getattr(e.response, "status_code", None)
+                if attempt == self.retries or status not in (None, 401):
+                    raise DownloadError(f"Failed to download {uid}\n{e}")
+                log.info(
+                    f"Download of {uid} interrupted ({e}), "
+                    f"resuming ({attempt + 1}/{self.retries})"
+                )
+            except ExtractionError:
+                raise
+            except Exception as e:
+                raise DownloadError(f"Failed to download {uid}\n{e}")
+
+    def _download_stream(
+        self, url: str, part_file: Path, content_length: int | None
+    ) -> None:
+        """Download `url` into `part_file` over a single connection,
+        resuming from the current size of `part_file`."""
+        name = part_file.name
+        for attempt in range(self.retries + 1):
+            offset = part_file.stat().st_size if part_file.exists() else 0
+            if content_length is not None and offset >= content_length:
+                break
+            headers = {"Authorization": f"Bearer {self._get_access_token()}"}
+            if offset:
+                headers["Range"] = f"bytes={offset}-"
+            try:
+                with self.session.get(url, headers=headers, stream=True) as response:
+                    if response.status_code == 416:
+                        # Nothing left to fetch past the end of the .part file
+                        break
+                    if response.status_code == 401:
+                        self.token_manager.invalidate()
+                    response.raise_for_status()
+                    # The server ignored the range and sends the whole product
+                    mode = "ab" if response.status_code == 206 else "wb"
+                    with open(part_file, mode) as file:
+                        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                            if chunk:
+                                file.write(chunk)
+                if content_length is None or part_file.stat().st_size >= content_length:
+                    break
+                log.info(f"Download of {name} ended early, resuming")
+            except requests.exceptions.RequestException as e:
+                status = getattr(e.response, "status_code", None)
+                if attempt == self.retries or status not in (None, 401):
+                    raise DownloadError(f"Failed to download {name}\n{e}")
+                log.info(
+                    f"Download of {name} interrupted ({e}), "
+                    f"resuming ({attempt + 1}/{self.retries})"
+                )
+            except Exception as e:
+                raise DownloadError(f"Failed to download {name}\n{e}")
+
+    def _download_segmented(
+        self, url: str, part_file: Path, content_length: int, segments: int
+    ) -> None:
+        """Download `url` into a preallocated `part_file` as `segments` byte
+        ranges fetched concurrently.
+
+        Each range is retried and resumed on its own up to `retries` times.
+        The range size and the finished ranges are recorded next to the
+        `.part` file, so an interrupted download only fetches the missing
+        ranges again, whatever `segments` it is resumed with.
+        """
+        name = part_file.name
+        progress_file = _progress_file(part_file)
+        progress = None
+        if part_file.exists() and progress_file.exists():
+            progress = json.loads(progress_file.read_text())
+        # Progress files of earlier versions only list the finished ranges
+        if not isinstance(progress, dict):
+            progress = {"size": -(-content_length // segments), "done": []}
+            # Recorded before preallocating, so the .part file is never
+            # mistaken for a finished single stream download
+            progress_file.write_text(json.dumps(progress))
+            with open(part_file, "wb") as file:
+                file.truncate(content_length)
+        size, done = progress["size"], set(progress["done"])
+        ranges = [
+            (start, min(start + size, content_length))
+            for start in range(0, content_length, size)
+        ]
+        lock = threading.Lock()
+
+        def fetch_range(start: int, end: int) -> None:
+            offset = start
+            for attempt in range(self.retries + 1):
+                headers = {
+                    "Authorization": f"Bearer {self._get_access_token()}",
+                    "Range": f"bytes={offset}-{end - 1}",
+                }
+                try:
+                    with self.session.get(
+                        url, headers=headers, stream=True
+                    ) as response:
+                        if response.status_code == 401:
+                            self.token_manager.invalidate()
+                        response.raise_for_status()
+                        if response.status_code != 206:
+                            raise DownloadError(
+                                f"Server does not support range requests for {name}"
+                            )
+                        with open(part_file, "r+b") as file:
+                            file.seek(offset)
+                            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                                chunk = chunk[: end - offset]
+                                file.write(chunk)
+                                offset += len(chunk)
+                    if offset >= end:
+                        with lock:
+                            done.add(f"{start}-{end}")
+                            progress["done"] = sorted(done)
+                            progress_file.write_text(json.dumps(progress))
+                        return
+                except requests.exceptions.RequestException as e:
+                    status = getattr(e.response, "status_code", None)
+                    if attempt == self.retries or status not in (None, 401):
+                        raise DownloadError(f"Failed to download {name}\n{e}")
+                    log.info(
+                        f"Range {offset}-{end - 1} of {name} interrupted ({e}), "
+                        f"resuming ({attempt + 1}/{self.retries})"
+                    )
+            raise DownloadError(f"Range {start}-{end - 1} of {name} is incomplete")
+
+        with ThreadPoolExecutor(segments) as executor:
+            futures = [
+                executor.submit(fetch_range, start, end)
+                for start, end in ranges
+                if f"{start}-{end}" not in done
+            ]
+            for future in futures:
+                future.result()
+        progress_file.unlink(missing_ok=True)
+
+    @staticmethod
+    def _verify_download(
+        part_file: Path, content_length: int | None, checksum: str | None
+    ) -> None:
+        """Check size and MD5 checksum of a finished download, discarding the
+        file if it is corrupt."""
+        size = part_file.stat().st_size if part_file.exists() else 0
+        if content_length is not None and size != content_length:
+            if size > content_length:
+                part_file.unlink()
+                _progress_file(part_file).unlink(missing_ok=True)
+            raise ChecksumError(
+                f"{part_file.name} has {size} bytes, expected {content_length}"
+            )
+        if checksum:
+            md5 = hashlib.md5()
+            with open(part_file, "rb") as file:
+                while block := file.read(HASH_BLOCK_SIZE):
+                    md5.update(block)
+            if md5.hexdigest().lower() != checksum.lower():
+                part_file.unlink()
+                _progress_file(part_file).unlink(missing_ok=True)
+                raise ChecksumError(
+                    f"{part_file.name} MD5 {md5.hexdigest()} does not match {checksum}"
+                )
 
     def download_all(
         self,
         products: pd.DataFrame,
-        out_dir: Path | str,
+        out_dir: Path | str | None = None,
         threads: int = 4,
         show_progress: bool = True,
+        segments: int = 1,
+        segment_threshold: int = SEGMENT_THRESHOLD,
     ) -> None:
         """Download all products in parallel using multithreading.
 
+        Products already complete in `out_dir` are skipped. With a
+        `product_store` and no `out_dir`, products are downloaded into the
+        store, stored ones are not fetched again and least recently used
+        ones are evicted to stay below the quota.
+
         Parameters:
         products : DataFrame
             Pandas Dataframe containing UIDs of the products to be downloaded
-        out_dir : Path | str
-            Output directory path for downloaded products
+        out_dir : Path | str, optional
+            Output directory path for downloaded products, required without
+            a `product_store`
         threads : int
             Number of simultaneous downloads
         show_progress : bool
             Show download progress bar
+        segments : int
+            Number of byte ranges fetched concurrently for products of at
+            least `segment_threshold` bytes, see `download_by_id`
+        segment_threshold : int
+            Minimum product size in bytes for a segmented download
         """
+        store = self.product_store if out_dir is None else None
+        if out_dir is None:
+            if store is None:
+                raise ValueError("out_dir is required without a product_store")
+            out_dir = store.root
         # Convert out_dir to Path object if it is a string
         if isinstance(out_dir, str):
             out_dir = Path(out_dir)
@@ -275,30 +1045,104 @@ class CopernicusDataspaceAPI(ABC):
         if show_progress:
             pbar = tqdm(total=len(products), unit="files")
 
-        # Generate tupe of UIds and Names for each product
-        prod_ids = [(prod.Id, prod.Name) for _, prod in products.iterrows()]
+        # Generate tupe of UIds, Names and integrity info for each product
+        prod_ids = [
+            (prod.Id, prod.Name, product_content_length(prod), product_checksum(prod))
+            for _, prod in products.iterrows()
+        ]
 
-        def download_worker(prod_id: str, prod_name: str) -> None:
+        def download_worker(
+            prod_id: str,
+            prod_name: str,
+            content_length: int | None,
+            checksum: str | None,
+        ) -> None:
             out_file = out_dir / f"{prod_name}"
+            reserved = 0
             try:
-                self.download_by_id(prod_id, out_path=out_file)
+                if store is not None and store.get(prod_name) is not None:
+                    log.info(f"Skipping {prod_name}, already in the store")
+                    return
+                if is_downloaded(out_file, content_length):
+                    log.info(f"Skipping {prod_name}, already downloaded")
+                    if store is not None:
+                        store.add(prod_name)
+                    return
+                if store is not None:
+                    reserved = content_length or 0
+                    store.reserve(reserved)
+                self.download_by_id(
+                    prod_id,
+                    out_path=out_file,
+                    content_length=content_length,
+                    checksum=checksum,
+                    segments=segments,
+                    segment_threshold=segment_threshold,
+                )
+                if store is not None:
+                    store.release(reserved)
+                    reserved = 0
+                    store.add(prod_name)
             except Exception as e:
                 raise DownloadError(
                     f"'{e.__class__.__name__}': "
                     f"Failed to download {prod_name}: {e.args[0]}"
                 )
             finally:
+                if reserved:
+                    store.release(reserved)
                 if show_progress:
                     pbar.update(1)
 
         threads_ = threads if threads else min(cpu_count() - 2, len(products))
+        self._resize_pool(threads_ * max(segments, 1))
         with ThreadPoolExecutor(threads_) as executor:
-            for prod_id, prod_name in prod_ids:
-                executor.submit(download_worker, prod_id, prod_name)
+            for prod in prod_ids:
+                executor.submit(download_worker, *prod)
 
         if show_progress:
             pbar.close()
 
+    async def download_all_async(
+        self,
+        products: pd.DataFrame,
+        out_dir: Path | str,
+        concurrency: int = 4,
+        bandwidth: float | None = None,
+        show_progress: bool = True,
+    ) -> "DownloadReport":
+        """Download all products concurrently using asyncio.
+
+        Products already complete in `out_dir` are skipped, failed downloads
+        are collected in the returned report instead of being raised.
+
+        Parameters:
+        products : DataFrame
+            Pandas Dataframe containing UIDs of the products to be downloaded
+        out_dir : Path | str
+            Output directory path for downloaded products
+        concurrency : int
+            Maximum number of simultaneous downloads
+        bandwidth : float, optional
+            Maximum combined download rate in bytes per second
+        show_progress : bool
+            Show download progress bar
+
+        Returns : DownloadReport
+            Per product results with transferred bytes, elapsed time and
+            errors
+        """
+        from .async_download import download_products
+
+        return await download_products(
+            self,
+            products,
+            Path(out_dir),
+            concurrency=concurrency,
+            bandwidth=bandwidth,
+            show_progress=show_progress,
+        )
+
 
 class Sentinel1API(CopernicusDataspaceAPI):
     """Class to download Sentinel-1 products"""
@@ -376,13 +1220,323 @@ class Sentinel6API(CopernicusDataspaceAPI):
 
     @property
     def mission(self):
-        return "SENTINEL-3"
+        return "SENTINEL-6"
 
     @property
     def prod_types(self) -> list[str]:
         return ["MW_2__AMR", "P4_1B_LR", "P4_2__LR"]
 
 
+# Client class of each mission, see `CopernicusDataspaceAPI.for_mission`
+MISSION_APIS = {
+    "SENTINEL-1": Sentinel1API,
+    "SENTINEL-2": Sentinel2API,
+    "SENTINEL-3": Sentinel3API,
+    "SENTINEL-5P": Sentinel5API,
+    "SENTINEL-6": Sentinel6API,
+}
+
+
+def odata_time(value: str) -> str:
+    """Format a '%Y-%m-%d' date as OData UTC timestamp, full timestamps are
+    returned unchanged."""
+    return value if "T" in value else f"{value}T00:00:00.000Z"
+
+
+def split_time_window(
+    start_time: str, end_time: str, split: Literal["day", "week"] | int
+) -> list[tuple[str, str]]:
+    """Split a query time window into consecutive sub-windows.
+
+    The catalogue filter excludes both window bounds, so every sub-window
+    reaches 1 ms into the next one to keep products acquired exactly at a
+    boundary.
+
+    Parameters:
+    start_time, end_time : str
+        Query window as '%Y-%m-%d' dates or ISO 8601 UTC timestamps
+    split : Literal {'day', 'week'} | int
+        Length of the sub-windows, or number of equal sub-windows
+
+    Returns:
+    list[tuple[str, str]]
+        Start and end timestamps of the sub-windows
+    """
+    start = pd.Timestamp(odata_time(start_time))
+    end = pd.Timestamp(odata_time(end_time))
+    if split == "day":
+        step = pd.Timedelta(days=1)
+    elif split == "week":
+        step = pd.Timedelta(weeks=1)
+    elif isinstance(split, int) and split > 0:
+        step = (end - start) / split
+    else:
+        raise ValueError(f"split must be 'day', 'week' or a positive int, got {split}")
+
+    def fmt(t: pd.Timestamp) -> str:
+        return t.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+    overlap = pd.Timedelta(milliseconds=1)
+    windows = []
+    while start < end:
+        stop = min(start + step, end)
+        windows.append((fmt(start), fmt(min(stop + overlap, end))))
+        start = stop
+    return windows
+
+
+def _odata_literal(value: int | float | str) -> str:
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    return repr(value)
+
+
+def attribute_filter_clause(name: str, values: list) -> str | None:
+    """Translate an attribute filter into an OData `Attributes/any` clause.
+
+    Only attributes listed in `ATTRIBUTE_VALUE_TYPES` are translated, values
+    are converted to the attribute's catalogue type. `cloudCover` takes a
+    [min, max] range, other attributes a list of acceptable values.
+
+    Parameters:
+    name : str
+        Attribute name
+    values : list
+        Range or acceptable values, as for `filter_by_attributes`
+
+    Returns:
+    str | None
+        OData filter clause, or None if the server can't apply the filter
+    """
+    kind = ATTRIBUTE_VALUE_TYPES.get(name)
+    if kind is None or not isinstance(values, (list, tuple)) or not values:
+        return None
+    if any(isinstance(value, bool) for value in values):
+        return None
+    if kind == "String":
+        if not all(isinstance(value, str) for value in values):
+            return None
+        literals = [_odata_literal(v) for v in values]
+    elif not all(isinstance(value, (int, float)) for value in values):
+        return None
+    elif kind == "Integer":
+        if any(value != int(value) for value in values):
+            return None
+        literals = [_odata_literal(int(v)) for v in values]
+    else:
+        literals = [_odata_literal(float(v)) for v in values]
+
+    value = f"att/OData.CSC.{kind}Attribute/Value"
+    if name == "cloudCover":
+        if len(literals) != 2:
+            return None
+        condition = f"{value} ge {literals[0]} and {value} le {literals[1]}"
+    else:
+        condition = " or ".join(f"{value} eq {literal}" for literal in literals)
+    return (
+        f"Attributes/OData.CSC.{kind}Attribute/any("
+        f"att:att/Name eq {_odata_literal(name)} and ({condition}))"
+    )
+
+
+def split_attribute_filters(
+    filters: dict[str, list],
+) -> tuple[dict[str, list], dict[str, list]]:
+    """Split attribute filters into those the catalogue can apply in
+    `$filter` and those that have to be applied locally.
+
+    Parameters:
+    filters : dict
+        Attribute filters as passed to `query`
+
+    Returns:
+    tuple[dict, dict]
+        Server side filters and local filters
+    """
+    server, local = {}, {}
+    for name, values in filters.items():
+        if attribute_filter_clause(name, values) is None:
+            local[name] = values
+        else:
+            server[name] = values
+    return server, local
+
+
+def product_content_length(product: pd.Series) -> int | None:
+    """Return the catalogue `ContentLength` of a product, if known."""
+    length = product.get("ContentLength")
+    return int(length) if pd.notna(length) and length else None
+
+
+def product_checksum(product: pd.Series) -> str | None:
+    """Return the MD5 checksum of a product from its catalogue `Checksum`
+    field, if available."""
+    checksums = product.get("Checksum")
+    if not isinstance(checksums, list):
+        return None
+    for checksum in checksums:
+        if checksum.get("Algorithm", "").upper() == "MD5" and checksum.get("Value"):
+            return checksum["Value"]
+    return None
+
+
+def _progress_file(part_file: Path) -> Path:
+    """File recording the finished byte ranges of a segmented download"""
+    return Path(str(part_file) + ".segments")
+
+
+def is_downloaded(out_path: Path, content_length: int | None = None) -> bool:
+    """Check whether a product was completely downloaded to `<out_path>.zip`.
+
+    Parameters:
+    out_path : Path
+        Output file path of the product, without the `.zip` suffix
+    content_length : int, optional
+        Expected size in bytes
+
+    Returns:
+    bool
+        True if the file exists and matches the expected size
+    """
+    out_file = Path(str(out_path) + ".zip")
+    if not out_file.exists():
+        return False
+    return content_length is None or out_file.stat().st_size == content_length
+
+
+def attribute_value_types(attrs: pd.DataFrame) -> pd.Series:
+    """Returns the OData value type (e.g. 'Double', 'String') of each row of
+    flattened product attributes, from `ValueType` or else `@odata.type`."""
+    types = pd.Series(None, index=attrs.index, dtype=object)
+    if "ValueType" in attrs:
+        types = attrs["ValueType"].astype(object)
+    if "@odata.type" in attrs:
+        odata_types = attrs["@odata.type"].str.extract(r"CSC\.(\w+)Attribute")[0]
+        types = types.fillna(odata_types)
+    return types
+
+
+def expand_attributes(
+    products: pd.DataFrame, drop: bool = True, names: list[str] | None = None
+) -> pd.DataFrame:
+    """Expand the nested product `Attributes` lists into typed columns.
+
+    All attribute lists are flattened in one pass and pivoted so that every
+    attribute name becomes a column. Attributes whose `ValueType` (or
+    `@odata.type`) is Double or Integer are stored as float64, all other
+    attributes as categoricals, so string values such as a
+    `processingBaseline` of "05.10" are kept as published.
+
+    Parameters:
+    products : pd.DataFrame
+        DataFrame of products as returned by the catalogue.
+    drop : bool
+        Drop the raw nested `Attributes` column after expansion.
+    names : list[str], optional
+        Only expand these attributes.
+
+    Returns:
+    pd.DataFrame
+        DataFrame with one additional column per product attribute.
+    """
+    if "Attributes" not in products:
+        return products
+
+    # One row per (product, attribute) pair
+    flat = products["Attributes"].explode().dropna()
+    if flat.empty:
+        return products.drop(columns="Attributes") if drop else products
+    attrs = pd.DataFrame(flat.tolist(), index=flat.index)
+    if names is not None:
+        attrs = attrs[attrs["Name"].isin(names)]
+    numeric_types = attribute_value_types(attrs).isin(NUMERIC_VALUE_TYPES)
+    numeric = set(attrs.loc[numeric_types, "Name"])
+    values = attrs.set_index("Name", append=True)["Value"]
+    values = values[~values.index.duplicated(keep="last")].unstack("Name")
+
+    columns = {}
+    for name, column in values.items():
+        if name in numeric:
+            columns[name] = pd.to_numeric(column, errors="coerce").astype("float64")
+        else:
+            columns[name] = column.astype("category")
+    expanded = pd.DataFrame(columns, index=values.index)
+
+    products = products.drop(columns=expanded.columns, errors="ignore")
+    if drop:
+        products = products.drop(columns="Attributes")
+    return products.join(expanded)
+
+
+def compact_products(products: pd.DataFrame) -> pd.DataFrame:
+    """Convert product fields into compact dtypes.
+
+    `ContentDate` is split into `ContentStart` and `ContentEnd`, and date
+    fields become UTC timestamps. Repetitive string fields become
+    categoricals.
+
+    Parameters:
+    products : pd.DataFrame
+        DataFrame of products with expanded attributes.
+
+    Returns:
+    pd.DataFrame
+        DataFrame with compact column dtypes.
+    """
+    products = products.copy()
+    if "ContentDate" in products:
+        dates = products.pop("ContentDate")
+        products["ContentStart"] = pd.to_datetime(dates.str["Start"], utc=True)
+        products["ContentEnd"] = pd.to_datetime(dates.str["End"], utc=True)
+    for col in DATE_COLUMNS:
+        if col in products:
+            products[col] = pd.to_datetime(products[col], utc=True)
+    for col in products.columns:
+        values = products[col]
+        if (
+            col not in REQUIRED_COLUMNS
+            and not isinstance(values.dtype, pd.CategoricalDtype)
+            and pd.api.types.infer_dtype(values, skipna=True) == "string"
+            and values.nunique() <= len(values) // 2
+        ):
+            products[col] = values.astype("category")
+    return products
+
+
+def content_start(products: pd.DataFrame) -> pd.Series:
+    """Returns the acquisition start of products as comparable values."""
+    if "ContentStart" in products:
+        return products["ContentStart"]
+    return products["ContentDate"].str["Start"]
+
+
+def concat_products(chunks: list[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate product DataFrame chunks, keeping categorical attributes
+    categorical across chunks with different categories.
+
+    Parameters:
+    chunks : list[pd.DataFrame]
+        Product DataFrames, e.g. as yielded by `query_iter`.
+
+    Returns:
+    pd.DataFrame
+        Single DataFrame with a fresh index.
+    """
+    if not chunks:
+        return pd.DataFrame()
+    categorical = {
+        col
+        for chunk in chunks
+        for col, dtype in chunk.dtypes.items()
+        if isinstance(dtype, pd.CategoricalDtype)
+    }
+    products = pd.concat(chunks, ignore_index=True)
+    for col in categorical:
+        if not isinstance(products[col].dtype, pd.CategoricalDtype):
+            products[col] = products[col].astype("category")
+    return products
+
+
 def filter_by_cloud_cover(
     prod_df: pd.DataFrame, min_cover: float = 0, max_cover: float = 100
 ) -> pd.DataFrame:
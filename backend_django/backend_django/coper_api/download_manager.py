@@ -0,0 +1,300 @@
+"""Module providing a persistent, restart-safe queue of CDSE product downloads"""
+
+import sqlite3
+import threading
+import time
+import logging as log
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from pathlib import Path
+
+import pandas as pd
+
+from .copernicus_api import (
+    CopernicusDataspaceAPI,
+    is_downloaded,
+    product_checksum,
+    product_content_length,
+)
+
+QUEUED = "queued"
+IN_PROGRESS = "in_progress"
+DONE = "done"
+FAILED = "failed"
+STATES = (QUEUED, IN_PROGRESS, DONE, FAILED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS downloads (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    content_length INTEGER,
+    checksum TEXT,
+    priority INTEGER NOT NULL DEFAULT 0,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    bytes INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    queued_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS downloads_next ON downloads (state, priority, queued_at);
+"""
+
+
+class DownloadManager:
+    """Priority queue of product downloads backed by a SQLite manifest.
+
+    The manifest records the state of every product (queued, in_progress,
+    done or failed) with its attempts, downloaded bytes and last error, so a
+    crashed or restarted worker resumes where it stopped. Running workers
+    renew the lease on the products they download, so only products whose
+    lease expired are taken over by another worker. Products are
+    transferred with `CopernicusDataspaceAPI.download_by_id`, which resumes
+    partial files itself.
+
+    Parameters
+    ----------
+    api : CopernicusDataspaceAPI
+        Client used for the transfers
+    manifest : Path | str
+        SQLite manifest file
+    out_dir : Path | str
+        Output directory for downloaded products
+    max_attempts : int, optional
+        Attempts after which a product is marked as failed
+    lease : float, optional
+        Seconds after which a product in progress without renewed lease is
+        considered abandoned by its worker
+    """
+
+    def __init__(
+        self,
+        api: CopernicusDataspaceAPI,
+        manifest: Path | str,
+        out_dir: Path | str,
+        max_attempts: int = 3,
+        lease: float = 300,
+    ) -> None:
+        self.api = api
+        self.manifest = Path(manifest)
+        self.out_dir = Path(out_dir)
+        self.max_attempts = max_attempts
+        self.lease = lease
+        self._lock = threading.Lock()
+        self.manifest.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as db:
+            db.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.manifest, timeout=30)
+        db.row_factory = sqlite3.Row
+        return db
+
+    def enqueue(self, products: pd.DataFrame, priority: int = 0) -> int:
+        """Add products to the queue. Products already in the manifest keep
+        their state, queued ones get the higher of both priorities.
+
+        Parameters:
+        products : DataFrame
+            Products as returned by `CopernicusDataspaceAPI.query`
+        priority : int
+            Higher priorities are downloaded first
+
+        Returns : int
+            Number of newly queued products
+        """
+        now = time.time()
+        rows = [
+            (
+                prod.Id,
+                prod.Name,
+                product_content_length(prod),
+                product_checksum(prod),
+                priority,
+                QUEUED,
+                now,
+                now,
+            )
+            for _, prod in products.iterrows()
+        ]
+        count = "SELECT COUNT(*) FROM downloads"
+        with closing(self._connect()) as db, db:
+            before = db.execute(count).fetchone()[0]
+            db.executemany(
+                "INSERT INTO downloads (id, name, content_length, checksum,"
+                " priority, state, queued_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (id) DO UPDATE SET"
+                " priority = MAX(priority, excluded.priority)"
+                " WHERE state = 'queued'",
+                rows,
+            )
+            inserted = db.execute(count).fetchone()[0] - before
+        return inserted
+
+    def recover(self, lease: float | None = None) -> int:
+        """Requeue products left in progress by a crashed worker.
+
+        Parameters:
+        lease : float, optional
+            Only requeue products whose lease was not renewed for this many
+            seconds, all products in progress by default
+
+        Returns : int
+            Number of requeued products
+        """
+        now = time.time()
+        expired = now - lease if lease is not None else now
+        with closing(self._connect()) as db, db:
+            return db.execute(
+                "UPDATE downloads SET state = ?, updated_at = ?"
+                " WHERE state = ? AND updated_at <= ?",
+                (QUEUED, now, IN_PROGRESS, expired),
+            ).rowcount
+
+    def _renew(self, uids: list[str]) -> None:
+        """Renew the lease on products being downloaded"""
+        with closing(self._connect()) as db, db:
+            db.executemany(
+                "UPDATE downloads SET updated_at = ? WHERE id = ? AND state = ?",
+                [(time.time(), uid, IN_PROGRESS) for uid in uids],
+            )
+
+    def retry_failed(self) -> int:
+        """Requeue failed products with a fresh attempt budget.
+
+        Returns : int
+            Number of requeued products
+        """
+        with closing(self._connect()) as db, db:
+            return db.execute(
+                "UPDATE downloads SET state = ?, attempts = 0, error = NULL,"
+                " updated_at = ? WHERE state = ?",
+                (QUEUED, time.time(), FAILED),
+            ).rowcount
+
+    def _claim(self) -> sqlite3.Row | None:
+        """Atomically move the next queued product to in_progress"""
+        with self._lock, closing(self._connect()) as db, db:
+            return db.execute(
+                "UPDATE downloads SET state = ?, attempts = attempts + 1,"
+                " updated_at = ? WHERE id = ("
+                "  SELECT id FROM downloads WHERE state = ?"
+                "  ORDER BY priority DESC, queued_at LIMIT 1"
+                ") RETURNING *",
+                (IN_PROGRESS, time.time(), QUEUED),
+            ).fetchone()
+
+    def _finish(self, uid: str, state: str, size: int, error: str | None) -> None:
+        with closing(self._connect()) as db, db:
+            db.execute(
+                "UPDATE downloads SET state = ?, bytes = ?, error = ?,"
+                " updated_at = ? WHERE id = ?",
+                (state, size, error, time.time(), uid),
+            )
+
+    def _process(self, job: sqlite3.Row, **kwargs) -> None:
+        out_path = self.out_dir / job["name"]
+        part_file = Path(str(out_path) + ".zip.part")
+        try:
+            if is_downloaded(out_path, job["content_length"]):
+                out_file = Path(str(out_path) + ".zip")
+            else:
+                out_file = self.api.download_by_id(
+                    job["id"],
+                    out_path,
+                    content_length=job["content_length"],
+                    checksum=job["checksum"],
+                    **kwargs,
+                )
+            self._finish(job["id"], DONE, out_file.stat().st_size, None)
+        except Exception as e:
+            size = part_file.stat().st_size if part_file.exists() else 0
+            state = FAILED if job["attempts"] >= self.max_attempts else QUEUED
+            error = f"{e.__class__.__name__}: {e}"
+            self._finish(job["id"], state, size, error)
+            log.error(f"Failed to download {job['name']} ({state}): {error}")
+
+    def drain(
+        self, threads: int = 4, limit: int | None = None, **kwargs
+    ) -> dict[str, int]:
+        """Download queued products in priority order until the queue is
+        empty or `limit` products were processed.
+
+        Products left in progress by a crashed run are requeued first once
+        their lease expired, products of other running workers are left to
+        them.
+
+        Parameters:
+        threads : int
+            Number of simultaneous downloads
+        limit : int, optional
+            Maximum number of products to process
+        **kwargs
+            Passed to `download_by_id`, e.g. `segments`
+
+        Returns : dict
+            Number of products per state after draining
+        """
+        self.recover(self.lease)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.api._resize_pool(threads * max(kwargs.get("segments", 1), 1))
+        processed = 0
+        counter = threading.Lock()
+        active: set[str] = set()
+        stopped = threading.Event()
+
+        def renew() -> None:
+            while not stopped.wait(self.lease / 3):
+                with counter:
+                    uids = list(active)
+                if uids:
+                    self._renew(uids)
+
+        def worker() -> None:
+            nonlocal processed
+            while True:
+                with counter:
+                    if limit is not None and processed >= limit:
+                        return
+                    processed += 1
+                job = self._claim()
+                if job is None:
+                    return
+                with counter:
+                    active.add(job["id"])
+                try:
+                    self._process(job, **kwargs)
+                finally:
+                    with counter:
+                        active.discard(job["id"])
+
+        renewer = threading.Thread(target=renew, daemon=True)
+        renewer.start()
+        try:
+            with ThreadPoolExecutor(threads) as executor:
+                for future in [executor.submit(worker) for _ in range(threads)]:
+                    future.result()
+        finally:
+            stopped.set()
+            renewer.join()
+        return self.status()
+
+    def status(self) -> dict[str, int]:
+        """Number of products per state"""
+        with closing(self._connect()) as db:
+            counts = dict(
+                db.execute("SELECT state, COUNT(*) FROM downloads GROUP BY state")
+            )
+        return {state: counts.get(state, 0) for state in STATES}
+
+    def entries(self, state: str | None = None) -> pd.DataFrame:
+        """Manifest entries in download order, optionally of one state"""
+        query = "SELECT * FROM downloads"
+        args: tuple = ()
+        if state:
+            query += " WHERE state = ?"
+            args = (state,)
+        query += " ORDER BY priority DESC, queued_at"
+        with closing(self._connect()) as db:
+            return pd.read_sql_query(query, db, params=args)
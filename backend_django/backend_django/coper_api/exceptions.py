@@ -34,7 +34,20 @@ class DownloadError(Exception):
     pass
 
 
+class ChecksumError(DownloadError):
+    """Raised when a downloaded product does not match the size or checksum
+    published in the catalogue."""
+
+    pass
+
+
 class FilterByAttributeError(Exception):
     """Raised when filtering products locally by attributes fails."""
 
     pass
+
+
+class ExtractionError(Exception):
+    """Raised when members cannot be extracted from a product archive."""
+
+    pass
@@ -0,0 +1,405 @@
+"""Module for extracting selected members of product archives without
+unpacking the whole archive"""
+
+import fnmatch
+import io
+import os
+import re
+import shutil
+import struct
+import zipfile
+import zlib
+from pathlib import Path, PurePosixPath
+from typing import Callable, Iterable
+
+from .exceptions import ExtractionError
+
+COPY_SIZE = 1024 * 1024
+
+_LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+_LOCAL_SIG = 0x04034B50
+_DESCRIPTOR_SIG = b"PK\x07\x08"
+# Records following the last member, the stream parser stops at them
+_TRAILER_SIGS = {0x02014B50, 0x06064B50, 0x06054B50}
+_ZIP64_EXTRA = 0x0001
+_DATA_DESCRIPTOR = 0x08
+
+
+def member_matcher(
+    patterns: list[str] | None = None, bands: list[str] | None = None
+) -> Callable[[str], bool]:
+    """Build a predicate selecting archive members.
+
+    Parameters:
+    patterns : list[str], optional
+        Glob patterns matched against the full member path, e.g.
+        `"*/IMG_DATA/R10m/*.jp2"` or `"*.nc"`
+    bands : list[str], optional
+        Band names matched in the member file name, e.g. `["B04", "B08"]`
+        selects `..._B04_10m.jp2` and `..._B08.jp2`
+
+    Returns : Callable[[str], bool]
+        True for members matching any pattern or band, for every file if
+        neither is given
+    """
+    band_re = (
+        re.compile(rf"_({'|'.join(map(re.escape, bands))})[_.]") if bands else None
+    )
+
+    def match(name: str) -> bool:
+        if name.endswith("/"):
+            return False
+        if not patterns and not bands:
+            return True
+        if patterns and any(fnmatch.fnmatchcase(name, p) for p in patterns):
+            return True
+        return bool(band_re and band_re.search(PurePosixPath(name).name))
+
+    return match
+
+
+def _target(out_dir: Path, name: str, flatten: bool) -> Path:
+    """Path of member `name` below `out_dir`, refusing paths leaving it."""
+    member = PurePosixPath(name)
+    if member.is_absolute() or ".." in member.parts:
+        raise ExtractionError(f"Unsafe member path {name}")
+    return out_dir / (member.name if flatten else Path(*member.parts))
+
+
+class _Sink:
+    """Output of one extracted member, a file written atomically or an
+    in-memory buffer."""
+
+    def __init__(self, name: str, out_dir: Path | None, flatten: bool) -> None:
+        self.name = name
+        self.crc = 0
+        if out_dir is None:
+            self.path = None
+            self.file = io.BytesIO()
+        else:
+            self.path = _target(out_dir, name, flatten)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.file = open(self.path.with_name(self.path.name + ".part"), "wb")
+
+    def write(self, data: bytes) -> None:
+        self.crc = zlib.crc32(data, self.crc)
+        self.file.write(data)
+
+    def close(self, crc: int | None = None) -> Path | bytes:
+        if crc is not None and crc != self.crc:
+            self.abort()
+            raise ExtractionError(f"CRC mismatch in member {self.name}")
+        if self.path is None:
+            return self.file.getvalue()
+        self.file.close()
+        os.replace(self.file.name, self.path)
+        return self.path
+
+    def abort(self) -> None:
+        self.file.close()
+        if self.path is not None:
+            Path(self.file.name).unlink(missing_ok=True)
+
+
+def extract_members(
+    archive: Path | str,
+    out_dir: Path | str | None = None,
+    *,
+    patterns: list[str] | None = None,
+    bands: list[str] | None = None,
+    flatten: bool = False,
+) -> dict[str, Path | bytes]:
+    """Extract selected members of a downloaded product archive.
+
+    Only the central directory and the selected members are read.
+
+    Parameters:
+    archive : Path | str
+        Path of the `.zip` product
+    out_dir : Path | str, optional
+        Directory the members are written to. Without it, member contents
+        are returned in memory.
+    patterns, bands : list[str], optional
+        Members to extract, see `member_matcher`
+    flatten : bool, optional
+        Write members directly into `out_dir` instead of their archive path
+
+    Returns : dict[str, Path | bytes]
+        Extracted file path, or content, by member name
+    """
+    match = member_matcher(patterns, bands)
+    out_dir = Path(out_dir) if out_dir is not None else None
+    extracted = {}
+    try:
+        with zipfile.ZipFile(archive) as zf:
+            for info in zf.infolist():
+                if not match(info.filename):
+                    continue
+                sink = _Sink(info.filename, out_dir, flatten)
+                try:
+                    with zf.open(info) as member:
+                        shutil.copyfileobj(member, sink.file, COPY_SIZE)
+                except Exception:
+                    sink.abort()
+                    raise
+                extracted[info.filename] = sink.close()
+    except (zipfile.BadZipFile, OSError) as e:
+        raise ExtractionError(f"Failed to extract from {archive}: {e}")
+    return extracted
+
+
+class ZipStreamExtractor:
+    """Extract selected members from a zip archive while it is received.
+
+    Bytes are passed to `feed` in order, e.g. the chunks of a download, and
+    the local file headers are parsed as they arrive. Selected members are
+    decompressed straight into their output, other members are skipped.
+    Stored members of unknown size end at the first data descriptor whose
+    sizes and CRC match the bytes read.
+
+    Parameters
+    ----------
+    out_dir : Path | str, optional
+        Directory the members are written to, in memory without it
+    patterns, bands : list[str], optional
+        Members to extract, see `member_matcher`
+    flatten : bool, optional
+        Write members directly into `out_dir` instead of their archive path
+    """
+
+    def __init__(
+        self,
+        out_dir: Path | str | None = None,
+        *,
+        patterns: list[str] | None = None,
+        bands: list[str] | None = None,
+        flatten: bool = False,
+    ) -> None:
+        self.out_dir = Path(out_dir) if out_dir is not None else None
+        self.match = member_matcher(patterns, bands)
+        self.flatten = flatten
+        self.extracted: dict[str, Path | bytes] = {}
+        # Bytes consumed so far, where a resumed download continues
+        self.offset = 0
+        self._buffer = bytearray()
+        self._state = "header"
+        self._member = None
+
+    @property
+    def done(self) -> bool:
+        """True once all members were read"""
+        return self._state == "done"
+
+    def feed(self, data: bytes) -> None:
+        """Consume the next bytes of the archive."""
+        self.offset += len(data)
+        if self.done:
+            return
+        self._buffer += data
+        try:
+            while self._step():
+                pass
+        except Exception:
+            self._abort()
+            raise
+
+    def close(self) -> dict[str, Path | bytes]:
+        """Finish extraction once the whole archive was fed.
+
+        Returns : dict[str, Path | bytes]
+            Extracted file path, or content, by member name
+        """
+        if not self.done:
+            self._abort()
+            raise ExtractionError("Archive ended in the middle of a member")
+        return self.extracted
+
+    def _abort(self) -> None:
+        if self._member and self._member["sink"]:
+            self._member["sink"].abort()
+        self._member = None
+        # Members of a broken archive are not returned, don't leave them behind
+        for output in self.extracted.values():
+            if isinstance(output, Path):
+                output.unlink(missing_ok=True)
+        self.extracted.clear()
+
+    def _step(self) -> bool:
+        """Advance the parser, False when more bytes are needed."""
+        if self._state == "header":
+            return self._read_header()
+        if self._state == "data":
+            return self._read_data()
+        if self._state == "descriptor":
+            return self._read_descriptor()
+        self._buffer.clear()
+        return False
+
+    def _read_header(self) -> bool:
+        buf = self._buffer
+        if len(buf) < 4:
+            return False
+        (sig,) = struct.unpack_from("<I", buf)
+        if sig in _TRAILER_SIGS:
+            self._state = "done"
+            return True
+        if sig != _LOCAL_SIG:
+            raise ExtractionError(f"Invalid zip header at offset {self.offset}")
+        if len(buf) < _LOCAL_HEADER.size:
+            return False
+        _, _, flags, method, _, _, crc, csize, usize, name_len, extra_len = (
+            _LOCAL_HEADER.unpack_from(buf)
+        )
+        end = _LOCAL_HEADER.size + name_len + extra_len
+        if len(buf) < end:
+            return False
+        name = bytes(buf[_LOCAL_HEADER.size : end - extra_len]).decode(
+            "utf-8" if flags & 0x800 else "cp437"
+        )
+        extra = bytes(buf[end - extra_len : end])
+        zip64 = False
+        pos = 0
+        while pos + 4 <= len(extra):
+            tag, size = struct.unpack_from("<HH", extra, pos)
+            if tag == _ZIP64_EXTRA:
+                zip64 = True
+                values = iter(struct.unpack_from(f"<{size // 8}Q", extra, pos + 4))
+                if usize == 0xFFFFFFFF:
+                    usize = next(values)
+                if csize == 0xFFFFFFFF:
+                    csize = next(values)
+            pos += 4 + size
+        if method not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+            raise ExtractionError(f"Unsupported compression of member {name}")
+        descriptor = bool(flags & _DATA_DESCRIPTOR)
+        del buf[:end]
+        selected = self.match(name)
+        self._member = {
+            "name": name,
+            "crc": None if descriptor else crc,
+            "remaining": csize if csize or not descriptor else None,
+            "zip64": zip64,
+            "descriptor": descriptor,
+            # Size and CRC of the data read so far, to find the descriptor
+            # ending a stored member of unknown size
+            "size": 0,
+            "data_crc": 0,
+            "inflate": (
+                zlib.decompressobj(-zlib.MAX_WBITS)
+                if method == zipfile.ZIP_DEFLATED and (selected or not csize)
+                else None
+            ),
+            "sink": (_Sink(name, self.out_dir, self.flatten) if selected else None),
+        }
+        self._state = "data"
+        return True
+
+    def _read_data(self) -> bool:
+        member = self._member
+        buf = self._buffer
+        remaining = member["remaining"]
+        if not buf and remaining != 0:
+            return False
+        inflate = member["inflate"]
+        if remaining is None and not inflate:
+            if not self._scan_stored():
+                return False
+        elif remaining is None:
+            # Deflate stream of unknown size, it ends itself
+            data = bytes(buf)
+            buf.clear()
+            self._write(inflate.decompress(data))
+            if not inflate.eof:
+                return False
+            buf[:0] = inflate.unused_data
+        else:
+            data = bytes(buf[:remaining])
+            del buf[: len(data)]
+            member["remaining"] -= len(data)
+            if inflate:
+                self._write(inflate.decompress(data))
+            elif member["sink"]:
+                self._write(data)
+            if member["remaining"]:
+                return False
+            if inflate:
+                self._write(inflate.flush())
+        if member["descriptor"]:
+            self._state = "descriptor"
+        else:
+            self._finish()
+        return True
+
+    def _scan_stored(self) -> bool:
+        """Consume the data of a stored member of unknown size up to its data
+        descriptor, False when more bytes are needed."""
+        member = self._member
+        buf = self._buffer
+        size = 20 if member["zip64"] else 12
+        sizes = "<QQ" if member["zip64"] else "<II"
+        start = 0
+        while True:
+            pos = buf.find(_DESCRIPTOR_SIG, start)
+            if pos < 0:
+                # Keep a possibly split signature for the next chunk
+                self._consume_stored(max(0, len(buf) - len(_DESCRIPTOR_SIG) + 1))
+                return False
+            if len(buf) < pos + 4 + size:
+                self._consume_stored(pos)
+                return False
+            (crc,) = struct.unpack_from("<I", buf, pos + 4)
+            csize, usize = struct.unpack_from(sizes, buf, pos + 8)
+            length = member["size"] + pos
+            if csize == usize == length and crc == zlib.crc32(
+                buf[:pos], member["data_crc"]
+            ):
+                self._consume_stored(pos)
+                return True
+            # The signature bytes are part of the data
+            start = pos + 1
+
+    def _consume_stored(self, length: int) -> None:
+        member = self._member
+        data = bytes(self._buffer[:length])
+        del self._buffer[:length]
+        member["size"] += length
+        member["data_crc"] = zlib.crc32(data, member["data_crc"])
+        self._write(data)
+
+    def _read_descriptor(self) -> bool:
+        member = self._member
+        buf = self._buffer
+        size = 20 if member["zip64"] else 12
+        if len(buf) < 4:
+            return False
+        start = 4 if buf[:4] == _DESCRIPTOR_SIG else 0
+        if len(buf) < start + size:
+            return False
+        (member["crc"],) = struct.unpack_from("<I", buf, start)
+        del buf[: start + size]
+        self._finish()
+        return True
+
+    def _write(self, data: bytes) -> None:
+        if data and self._member["sink"]:
+            self._member["sink"].write(data)
+
+    def _finish(self) -> None:
+        member = self._member
+        if member["sink"]:
+            self.extracted[member["name"]] = member["sink"].close(member["crc"])
+        self._member = None
+        self._state = "header"
+
+
+def extract_stream(
+    chunks: Iterable[bytes],
+    out_dir: Path | str | None = None,
+    **kwargs,
+) -> dict[str, Path | bytes]:
+    """Extract selected members from the chunks of a zip archive, see
+    `ZipStreamExtractor` for the arguments."""
+    extractor = ZipStreamExtractor(out_dir, **kwargs)
+    for chunk in chunks:
+        extractor.feed(chunk)
+    return extractor.close()
@@ -1,36 +1,323 @@
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
+
 import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
 from pathlib import Path
+from shapely import STRtree
+from shapely.geometry import shape
+from shapely.geometry.base import BaseGeometry
 from shapely.wkt import loads
 
 from .exceptions import WKTError
 
+# Number of parsed AOI geometries kept in memory
+GEOMETRY_CACHE_SIZE = 64
+
+# Parsed AOI geometries by WKT hash or by vector file path and mtime, in
+# least recently used order
+_geometries: OrderedDict[tuple, BaseGeometry] = OrderedDict()
+_geometries_lock = threading.Lock()
+
+
+def _cached_geometry(key: tuple, load) -> BaseGeometry:
+    """Returns the cached geometry of `key`, calling `load` on a miss."""
+    with _geometries_lock:
+        if key in _geometries:
+            _geometries.move_to_end(key)
+            return _geometries[key]
+    geom = load()
+    with _geometries_lock:
+        _geometries[key] = geom
+        while len(_geometries) > GEOMETRY_CACHE_SIZE:
+            _geometries.popitem(last=False)
+    return geom
+
+
+def _parse_wkt(text: str) -> BaseGeometry:
+    key = ("wkt", hashlib.sha1(text.encode()).hexdigest())
+    return _cached_geometry(key, lambda: loads(text))
+
+
+def _read_vector_file(path: Path) -> BaseGeometry:
+    stat = path.stat()
+    # A rewritten file gets a new key
+    key = ("file", str(path.resolve()), stat.st_mtime_ns, stat.st_size)
+    return _cached_geometry(
+        key, lambda: shapely.union_all(gpd.read_file(path).geometry.values)
+    )
+
 
 def is_wkt(text: str) -> bool:
-    """Check if the input string is in WKT format."""
+    """Check if the input string is in WKT format. The parsed geometry is
+    cached for `load_geometry`."""
     try:
-        loads(text)
+        _parse_wkt(text)
         return True
     except Exception:
         return False
 
 
-def to_openeo_wkt(aoi: Path | str | None) -> str | None:
-    """Returns WKT coordinates of area extent"""
+def load_geometry(aoi: Path | str | BaseGeometry) -> BaseGeometry:
+    """Returns the area of interest as shapely geometry.
+
+    WKT strings are parsed, and vector files read and dissolved, only once
+    while they stay in the geometry cache.
+
+    Parameters:
+    aoi : Path | str | BaseGeometry
+        WKT, path of a vector file readable by geopandas, or a geometry
+
+    Returns : BaseGeometry
+        Geometry of the AOI
+    """
+    if isinstance(aoi, BaseGeometry):
+        return aoi
+    if isinstance(aoi, str) and is_wkt(aoi):
+        return _parse_wkt(aoi)
+    try:
+        return _read_vector_file(Path(aoi))
+    except Exception as e:
+        raise WKTError(e)
+
+
+def simplify_geometry(
+    geom: BaseGeometry, tolerance: float | None = None, precision: int | None = None
+) -> BaseGeometry:
+    """Reduce the vertices of a geometry to shorten query URLs.
+
+    Parameters:
+    geom : BaseGeometry
+        Geometry to simplify
+    tolerance : float, optional
+        Maximum displacement of the outline in degrees. Simplification
+        preserves topology, polygons stay valid and don't collapse.
+    precision : int, optional
+        Number of decimal places coordinates are snapped to
+
+    Returns : BaseGeometry
+        Simplified geometry
+    """
+    if tolerance:
+        geom = shapely.simplify(geom, tolerance, preserve_topology=True)
+    if precision is not None:
+        geom = shapely.set_precision(geom, 10.0**-precision)
+    return geom
+
+
+def to_openeo_wkt(
+    aoi: Path | str | None,
+    tolerance: float | None = None,
+    precision: int | None = None,
+) -> str | None:
+    """Returns WKT coordinates of area extent, optionally simplified with
+    `simplify_geometry`"""
     if aoi is None:
         return None
 
-    if isinstance(aoi, str):
+    if isinstance(aoi, str) and not tolerance and precision is None:
         if is_wkt(aoi):
             return aoi
-        else:
-            try:
-                gdf = gpd.read_file(aoi)
-                return gdf.unary_union.wkt
-            except Exception as e:
-                raise WKTError(e)
 
-    try:
-        gdf = gpd.read_file(aoi)
-        return gdf.unary_union.wkt
-    except Exception as e:
-        raise WKTError(e)
+    geom = simplify_geometry(load_geometry(aoi), tolerance, precision)
+    if precision is None:
+        return geom.wkt
+    return shapely.to_wkt(geom, rounding_precision=precision, trim=True)
+
+
+def tile_geometry(aoi: Path | str | BaseGeometry, size: float) -> list[BaseGeometry]:
+    """Split an area of interest into polygons along a grid of `size`
+    degrees, e.g. to query a large AOI tile by tile in parallel.
+
+    The grid is aligned to multiples of `size`, so the same AOI always gives
+    the same tiles.
+
+    Parameters:
+    aoi : Path | str | BaseGeometry
+        Area of interest, see `load_geometry`
+    size : float
+        Tile edge length in degrees
+
+    Returns : list[BaseGeometry]
+        Non-empty polygons of the AOI within each grid cell
+    """
+    geom = load_geometry(aoi)
+    minx, miny, maxx, maxy = geom.bounds
+    xs = np.arange(np.floor(minx / size) * size, maxx, size)
+    ys = np.arange(np.floor(miny / size) * size, maxy, size)
+    x, y = (grid.ravel() for grid in np.meshgrid(xs, ys))
+    cells = shapely.box(x, y, x + size, y + size)
+    cells = cells[shapely.intersects(geom, cells)]
+    parts = shapely.get_parts(shapely.intersection(cells, geom))
+    return list(parts[shapely.area(parts) > 0])
+
+
+def footprint_geometry(product: pd.Series) -> BaseGeometry | None:
+    """Returns the footprint of a catalogue product as shapely geometry"""
+    footprint = product.get("GeoFootprint")
+    if isinstance(footprint, dict):
+        return shape(footprint)
+    footprint = product.get("Footprint")
+    if isinstance(footprint, str):
+        # e.g. geography'SRID=4326;POLYGON ((...))'
+        return loads(footprint.split(";", 1)[-1].rstrip("'"))
+    return None
+
+
+class FootprintIndex:
+    """STRtree over the footprints of the products of a query DataFrame.
+
+    Footprints are parsed once when the index is built, every AOI lookup is
+    then answered in memory.
+
+    Parameters
+    ----------
+    products : pd.DataFrame
+        Products with a `GeoFootprint` or `Footprint` column
+    """
+
+    def __init__(self, products: pd.DataFrame) -> None:
+        geometries = [footprint_geometry(prod) for _, prod in products.iterrows()]
+        # Rows without a footprint are left out of the tree
+        self.positions = np.array(
+            [i for i, geom in enumerate(geometries) if geom is not None], dtype=int
+        )
+        self.geometries = [geometries[i] for i in self.positions]
+        self.tree = STRtree(self.geometries)
+        self.ids = _row_ids(products)
+
+    def matches(self, products: pd.DataFrame) -> bool:
+        """Whether the index still describes the rows of `products`"""
+        ids = _row_ids(products)
+        return len(ids) == len(self.ids) and bool((ids == self.ids).all())
+
+    def query(self, aoi: str | BaseGeometry) -> np.ndarray:
+        """Returns the sorted row positions of the products whose footprint
+        intersects `aoi`, given as WKT or shapely geometry."""
+        aoi = load_geometry(aoi)
+        hits = self.tree.query(aoi, predicate="intersects")
+        return np.sort(self.positions[hits])
+
+
+def _row_ids(products: pd.DataFrame) -> np.ndarray:
+    """Product Ids of the rows of a query DataFrame, in row order"""
+    if "Id" not in products:
+        return products.index.to_numpy(copy=True)
+    return products["Id"].to_numpy(dtype=object, copy=True)
+
+
+# Footprint indexes of live query DataFrames by object id
+_indexes: dict[int, FootprintIndex] = {}
+
+
+def footprint_index(products: pd.DataFrame) -> FootprintIndex:
+    """Returns the FootprintIndex of `products`, building it on first use.
+
+    The index is kept for as long as the DataFrame is alive and rebuilt when
+    its rows no longer match the product Ids it was built from, e.g. after
+    an in-place sort or drop.
+    """
+    key = id(products)
+    index = _indexes.get(key)
+    if index is None:
+        weakref.finalize(products, _indexes.pop, key, None)
+    elif not index.matches(products):
+        index = None
+    if index is None:
+        index = _indexes[key] = FootprintIndex(products)
+    return index
+
+
+def products_intersecting(
+    products: pd.DataFrame, aoi: str | BaseGeometry
+) -> pd.DataFrame:
+    """Filter a query DataFrame locally to the products intersecting `aoi`.
+
+    Parameters:
+    products : pd.DataFrame
+        Products as returned by `CopernicusDataspaceAPI.query`
+    aoi : str | BaseGeometry
+        Area of interest as WKT or shapely geometry, in EPSG 4326
+
+    Returns:
+    pd.DataFrame
+        Products whose footprint intersects the AOI
+    """
+    return products.iloc[footprint_index(products).query(aoi)]
+
+
+def _preference_order(products: pd.DataFrame) -> np.ndarray:
+    """Row positions sorted by lowest cloud cover, then latest acquisition"""
+    order = pd.DataFrame(index=range(len(products)))
+    if "cloudCover" in products:
+        order["cloud"] = products["cloudCover"].fillna(100).to_numpy()
+    if "ContentStart" in products:
+        order["start"] = products["ContentStart"].to_numpy()
+    elif "ContentDate" in products:
+        order["start"] = products["ContentDate"].str["Start"].to_numpy()
+    if order.columns.empty:
+        return order.index.to_numpy()
+    ascending = [col == "cloud" for col in order.columns]
+    return order.sort_values(list(order.columns), ascending=ascending).index.to_numpy()
+
+
+def covering_products(
+    products: pd.DataFrame,
+    aoi: str | BaseGeometry,
+    coverage: float = 0.999,
+    gain_tolerance: float = 0.1,
+) -> pd.DataFrame:
+    """Select a near-minimal set of products whose footprints cover `aoi`.
+
+    Greedy set cover: each step picks the product covering the largest part
+    of the still uncovered AOI. Among products whose gain is within
+    `gain_tolerance` of the best one, the lowest `cloudCover` and then the
+    most recent acquisition is preferred.
+
+    Parameters:
+    products : pd.DataFrame
+        Products as returned by `CopernicusDataspaceAPI.query`
+    aoi : str | BaseGeometry
+        Area of interest as WKT or shapely geometry, in EPSG 4326
+    coverage : float
+        Fraction of the AOI area after which the selection stops
+    gain_tolerance : float
+        Relative shortfall from the best gain still considered equivalent
+
+    Returns:
+    pd.DataFrame
+        Selected products in selection order, to pass to `download_all`
+    """
+    aoi = load_geometry(aoi)
+    index = footprint_index(products)
+    hits = index.tree.query(aoi, predicate="intersects")
+    if not len(hits):
+        return products.iloc[[]]
+
+    # Candidates in preference order
+    rank = np.empty(len(products), dtype=int)
+    rank[_preference_order(products)] = np.arange(len(products))
+    hits = hits[np.argsort(rank[index.positions[hits]])]
+    candidates = np.array(index.geometries, dtype=object)[hits]
+    positions = index.positions[hits]
+
+    uncovered = aoi
+    target = aoi.area * (1 - coverage)
+    selected = []
+    available = np.ones(len(candidates), dtype=bool)
+    while uncovered.area > target and available.any():
+        gains = shapely.area(shapely.intersection(candidates, uncovered))
+        gains[~available] = 0
+        best = gains.max()
+        if best <= 0:
+            break
+        # First candidate in preference order with a near best gain
+        choice = int(np.argmax(gains >= best * (1 - gain_tolerance)))
+        selected.append(positions[choice])
+        available[choice] = False
+        uncovered = uncovered.difference(candidates[choice])
+    return products.iloc[selected]
@@ -0,0 +1,79 @@
+"""Module providing incremental parsing of OData catalogue responses"""
+
+import codecs
+import json
+import re
+from typing import Iterable, Iterator
+
+_VALUE_START = re.compile(r'"value"\s*:\s*\[')
+_SEPARATORS = " \t\r\n,"
+
+
+class ODataStream:
+    """Iterates over the `value` array of an OData JSON response while it
+    is being received, keeping only the current product in memory.
+
+    The other top-level members of the response (e.g. `@odata.nextLink`)
+    are available in `metadata` once the iteration has finished.
+
+    Parameters
+    ----------
+    chunks : Iterable[bytes]
+        Raw UTF-8 response body chunks, already decompressed
+    """
+
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self.chunks = iter(chunks)
+        self.metadata: dict = {}
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self._buffer = ""
+        self._eof = False
+
+    def _read(self) -> bool:
+        """Append the next chunk to the buffer, False at the end of the body"""
+        if self._eof:
+            return False
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            self._eof = True
+            self._buffer += self._decoder.decode(b"", final=True)
+            return False
+        self._buffer += self._decoder.decode(chunk)
+        return True
+
+    def __iter__(self) -> Iterator[dict]:
+        # Members before the value array
+        while not (match := _VALUE_START.search(self._buffer)):
+            if not self._read():
+                self.metadata = json.loads(self._buffer)
+                return
+        head = self._buffer[: match.start()]
+        self._buffer = self._buffer[match.end() :]
+        pos = 0
+
+        while True:
+            while pos < len(self._buffer) and self._buffer[pos] in _SEPARATORS:
+                pos += 1
+            if pos == len(self._buffer):
+                self._buffer, pos = "", 0
+                if not self._read():
+                    raise json.JSONDecodeError("Unterminated value array", "", 0)
+                continue
+            if self._buffer[pos] == "]":
+                self._buffer = self._buffer[pos + 1 :]
+                break
+            try:
+                product, pos = self._json.raw_decode(self._buffer, pos)
+            except json.JSONDecodeError:
+                # The product is not complete yet, drop the parsed part
+                self._buffer, pos = self._buffer[pos:], 0
+                if not self._read():
+                    raise
+                continue
+            yield product
+
+        # Members after the value array
+        while self._read():
+            pass
+        self.metadata = json.loads(f'{head}"value": []{self._buffer}')
@@ -0,0 +1,163 @@
+"""Module providing a disk-quota-aware store of downloaded CDSE products"""
+
+import sqlite3
+import threading
+import time
+import logging as log
+from contextlib import closing
+from pathlib import Path
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    name TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    last_access REAL NOT NULL,
+    pinned INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS products_lru ON products (pinned, last_access);
+"""
+
+
+class ProductStore:
+    """Directory of downloaded `.zip` products kept below a byte quota.
+
+    An SQLite index next to the products records their size, last access
+    time and pin flag, so lookups don't scan the directory. When space is
+    needed, the least recently used products that are not pinned are
+    deleted.
+
+    Parameters
+    ----------
+    root : Path | str
+        Directory holding the products
+    quota : int
+        Maximum total size of the stored products in bytes
+    index : Path | str, optional
+        SQLite index file, defaults to `<root>/.index.sqlite3`
+    """
+
+    def __init__(self, root: Path | str, quota: int, index: Path | str | None = None):
+        self.root = Path(root)
+        self.quota = quota
+        self.index = Path(index) if index else self.root / ".index.sqlite3"
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # Bytes promised to downloads in progress
+        self._reserved = 0
+        with closing(self._connect()) as db:
+            db.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.index, timeout=30)
+
+    def path(self, name: str) -> Path:
+        """Path of product `name` inside the store"""
+        return self.root / f"{name}.zip"
+
+    def get(self, name: str) -> Path | None:
+        """Return the path of a stored product and mark it as used, or None
+        if it is not stored."""
+        with closing(self._connect()) as db, db:
+            found = db.execute(
+                "UPDATE products SET last_access = ? WHERE name = ?",
+                (time.time(), name),
+            ).rowcount
+        if not found:
+            return None
+        if not self.path(name).exists():
+            self.remove(name)
+            return None
+        return self.path(name)
+
+    def add(self, name: str) -> Path:
+        """Index product `name` after it was written to `path(name)`."""
+        path = self.path(name)
+        with closing(self._connect()) as db, db:
+            db.execute(
+                "INSERT INTO products (name, size, last_access) VALUES (?, ?, ?)"
+                " ON CONFLICT (name) DO UPDATE SET"
+                " size = excluded.size, last_access = excluded.last_access",
+                (name, path.stat().st_size, time.time()),
+            )
+        self.evict()
+        return path
+
+    def remove(self, name: str) -> None:
+        """Delete product `name` and its index entry."""
+        self.path(name).unlink(missing_ok=True)
+        with closing(self._connect()) as db, db:
+            db.execute("DELETE FROM products WHERE name = ?", (name,))
+
+    def pin(self, name: str, pinned: bool = True) -> None:
+        """Protect product `name` from eviction, or release it again."""
+        with closing(self._connect()) as db, db:
+            db.execute(
+                "UPDATE products SET pinned = ? WHERE name = ?", (int(pinned), name)
+            )
+
+    def usage(self) -> int:
+        """Total size of the stored products in bytes"""
+        with closing(self._connect()) as db:
+            return db.execute("SELECT COALESCE(SUM(size), 0) FROM products").fetchone()[
+                0
+            ]
+
+    def reserve(self, size: int) -> None:
+        """Make room for a download of `size` bytes, see `release`."""
+        with self._lock:
+            self._reserved += size
+        self.evict()
+
+    def release(self, size: int) -> None:
+        """Return space reserved with `reserve` once the download finished
+        or failed."""
+        with self._lock:
+            self._reserved = max(self._reserved - size, 0)
+
+    def evict(self) -> list[str]:
+        """Delete least recently used, unpinned products until the stored
+        and reserved bytes fit the quota.
+
+        Returns : list[str]
+            Names of the evicted products
+        """
+        evicted = []
+        with self._lock, closing(self._connect()) as db, db:
+            excess = self.usage() + self._reserved - self.quota
+            if excess <= 0:
+                return evicted
+            for name, size in db.execute(
+                "SELECT name, size FROM products WHERE pinned = 0 ORDER BY last_access"
+            ).fetchall():
+                if excess <= 0:
+                    break
+                self.path(name).unlink(missing_ok=True)
+                db.execute("DELETE FROM products WHERE name = ?", (name,))
+                excess -= size
+                evicted.append(name)
+        if evicted:
+            log.info(f"Evicted {len(evicted)} products from {self.root}")
+        if excess > 0:
+            log.warning(f"{self.root} exceeds its quota by {excess} bytes")
+        return evicted
+
+    def rebuild(self) -> int:
+        """Index the `.zip` products already present in `root`, e.g. after
+        migrating an existing download directory.
+
+        Returns : int
+            Number of indexed products
+        """
+        now = time.time()
+        rows = [
+            (path.name[: -len(".zip")], path.stat().st_size, now)
+            for path in self.root.glob("*.zip")
+        ]
+        with closing(self._connect()) as db, db:
+            db.executemany(
+                "INSERT OR IGNORE INTO products (name, size, last_access)"
+                " VALUES (?, ?, ?)",
+                rows,
+            )
+        self.evict()
+        return len(rows)
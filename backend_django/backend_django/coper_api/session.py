@@ -0,0 +1,169 @@
+"""Module providing the pooled HTTP session shared by CDSE requests"""
+
+import threading
+import logging as log
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Transient statuses worth retrying, including rate limiting
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Number of most recent request latencies kept for percentiles
+LATENCY_WINDOW = 10000
+
+# Serializes pool resizes of sessions shared by several clients
+_pool_lock = threading.Lock()
+
+
+class RequestStats:
+    """Thread-safe collector of per-request latency and retry counts.
+
+    Request count, retries and mean latency cover all requests, percentiles
+    the last `window` requests, so memory stays bounded in long-lived
+    clients.
+    """
+
+    def __init__(self, window: int = LATENCY_WINDOW) -> None:
+        self._lock = threading.Lock()
+        self.latencies: deque[float] = deque(maxlen=window)
+        self.requests = 0
+        self.total_latency = 0.0
+        self.retries = 0
+        self.connections = 0
+
+    def record(self, latency: float, retries: int) -> None:
+        with self._lock:
+            self.latencies.append(latency)
+            self.requests += 1
+            self.total_latency += latency
+            self.retries += retries
+
+    def connection_opened(self) -> None:
+        with self._lock:
+            self.connections += 1
+
+    def summary(self) -> dict:
+        """Return request count, new connections, retries and latency
+        percentiles in seconds."""
+        with self._lock:
+            latencies = sorted(self.latencies)
+            requests_, total = self.requests, self.total_latency
+            retries, connections = self.retries, self.connections
+
+        def percentile(q: float) -> float | None:
+            if not latencies:
+                return None
+            return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+        return {
+            "requests": requests_,
+            "connections": connections,
+            "retries": retries,
+            "latency_mean": total / requests_ if requests_ else None,
+            "latency_p50": percentile(0.5),
+            "latency_p99": percentile(0.99),
+        }
+
+
+class _CountingAdapter(HTTPAdapter):
+    """HTTPAdapter that reports every newly opened connection to `stats`"""
+
+    def __init__(self, stats: RequestStats, **kwargs) -> None:
+        self.stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        stats = self.stats
+        pool_classes = {}
+        for scheme, pool_cls in self.poolmanager.pool_classes_by_scheme.items():
+
+            def _new_conn(pool, _pool_cls=pool_cls):
+                stats.connection_opened()
+                return _pool_cls._new_conn(pool)
+
+            pool_classes[scheme] = type(
+                pool_cls.__name__, (pool_cls,), {"_new_conn": _new_conn}
+            )
+        self.poolmanager.pool_classes_by_scheme = pool_classes
+
+
+def mount_pool(
+    session: requests.Session,
+    pool_size: int,
+    retries: int,
+    backoff_factor: float,
+    stats: RequestStats,
+) -> None:
+    """(Re)mount keep-alive connection pools with retry handling on `session`.
+
+    Parameters:
+    session : requests.Session
+        Session to mount the adapters on
+    pool_size : int
+        Number of connections kept alive per host
+    retries : int
+        Number of retries for connection errors and transient statuses
+    backoff_factor : float
+        Exponential backoff factor between retries. `Retry-After` headers
+        of 429/503 responses take precedence.
+    stats : RequestStats
+        Collector of opened connections
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = _CountingAdapter(
+        stats, pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.pool_size = pool_size
+
+
+def grow_pool(
+    session: requests.Session,
+    pool_size: int,
+    retries: int,
+    backoff_factor: float,
+    stats: RequestStats,
+) -> None:
+    """Remount the pools of `session` with `pool_size` connections per host
+    unless they are that large already. Pools never shrink, so clients
+    sharing the session can't starve each other's concurrent requests. See
+    `mount_pool` for the parameters."""
+    with _pool_lock:
+        if pool_size > getattr(session, "pool_size", 0):
+            mount_pool(session, pool_size, retries, backoff_factor, stats)
+
+
+def create_session(
+    pool_size: int = 4,
+    retries: int = 5,
+    backoff_factor: float = 1.0,
+    stats: RequestStats | None = None,
+) -> requests.Session:
+    """Create a keep-alive session with retries that records request latency
+    and retry counts into `stats`. See `mount_pool` for the parameters."""
+    stats = stats if stats is not None else RequestStats()
+    session = requests.Session()
+    mount_pool(session, pool_size, retries, backoff_factor, stats)
+
+    def record(response: requests.Response, *args, **kwargs) -> None:
+        history = getattr(response.raw, "retries", None)
+        retried = len(history.history) if history else 0
+        latency = response.elapsed.total_seconds()
+        stats.record(latency, retried)
+        log.debug(
+            f"{response.request.method} {response.url} -> {response.status_code} "
+            f"in {latency:.3f}s ({retried} retries)"
+        )
+
+    session.hooks["response"].append(record)
+    return session
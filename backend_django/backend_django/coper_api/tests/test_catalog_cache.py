@@ -0,0 +1,61 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from ..benchmarks.mock_cdse import MockCDSE, synthetic_catalog
+from ..catalog_cache import CatalogCache, _gaps
+from ..copernicus_api import Sentinel2API
+from ..exceptions import QueryError
+
+WINDOW = {"start_time": "2024-01-01", "end_time": "2024-02-01"}
+
+
+class GapsTests(unittest.TestCase):
+    def test_gaps(self):
+        windows = [("b", "c"), ("e", "f"), ("c", "d")]
+        self.assertEqual(_gaps(windows, "a", "g"), [("a", "b"), ("d", "e"), ("f", "g")])
+        self.assertEqual(_gaps(windows, "b", "d"), [])
+        self.assertEqual(_gaps(windows, "c", "e"), [("d", "e")])
+        self.assertEqual(_gaps([], "a", "b"), [("a", "b")])
+
+
+class CatalogCacheTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache = CatalogCache(Path(tmp.name) / "catalog.sqlite")
+        self.catalog = synthetic_catalog("SENTINEL-2", 2000)
+        self.mock = MockCDSE(catalog=self.catalog).start()
+        self.addCleanup(self.mock.stop)
+
+    def api(self) -> Sentinel2API:
+        return Sentinel2API(
+            "user",
+            "password",
+            token_url=self.mock.token_url,
+            catalog_url=self.mock.catalog_url,
+            retries=0,
+            catalog_cache=self.cache,
+        )
+
+    def test_cached_query(self):
+        online = self.api().query(**WINDOW)
+        catalog = self.mock.stats["catalog"]
+        offline = self.api().query(**WINDOW, offline=True)
+        self.assertEqual(len(online), len(self.catalog))
+        self.assertEqual(sorted(offline["Id"]), sorted(online["Id"]))
+        self.assertEqual(self.mock.stats["catalog"], catalog)
+
+    def test_backfill_before_cached_window(self):
+        self.api().query(start_time="2024-01-15", end_time="2024-02-01")
+        products = self.api().query(**WINDOW)
+        self.assertEqual(len(products), len(self.catalog))
+
+    def test_failed_split_is_fetched_again(self):
+        self.mock.failure_rate = 0.25
+        self.mock._random.seed(1)
+        with self.assertRaises(QueryError):
+            self.api().query(**WINDOW, split="week")
+        self.mock.failure_rate = 0
+        products = self.api().query(**WINDOW)
+        self.assertEqual(len(products), len(self.catalog))
@@ -0,0 +1,60 @@
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+from ..benchmarks.mock_cdse import MockCDSE
+from ..copernicus_api import Sentinel2API, _progress_file
+from ..exceptions import DownloadError
+
+SIZE = 4 * 1024 * 1024
+
+
+class InterruptedSegmentedDownloadTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.out_path = Path(tmp.name) / "product"
+        self.part_file = Path(str(self.out_path) + ".zip.part")
+        # Every transfer is dropped halfway through
+        self.mock = MockCDSE(products={"uid": SIZE}, drop_rate=1.0).start()
+        self.addCleanup(self.mock.stop)
+        self.api = Sentinel2API(
+            "user",
+            "password",
+            token_url=self.mock.token_url,
+            download_url=self.mock.download_url,
+            retries=0,
+        )
+        with self.assertRaises(DownloadError):
+            self.api.download_by_id(
+                "uid",
+                self.out_path,
+                content_length=SIZE,
+                segments=4,
+                segment_threshold=0,
+            )
+        self.assertEqual(self.part_file.stat().st_size, SIZE)
+        self.assertTrue(_progress_file(self.part_file).exists())
+        self.mock.drop_rate = 0
+
+    def test_resumed_with_one_segment(self):
+        out_file = self.api.download_by_id("uid", self.out_path, content_length=SIZE)
+        self.assertEqual(out_file.read_bytes(), self.mock.product_bytes("uid"))
+        self.assertFalse(_progress_file(self.part_file).exists())
+
+    def test_resumed_async(self):
+        products = pd.DataFrame(
+            [{"Id": "uid", "Name": "product", "ContentLength": SIZE}]
+        )
+        report = asyncio.run(
+            self.api.download_all_async(
+                products, self.out_path.parent, show_progress=False
+            )
+        )
+        self.assertEqual(report.summary()["downloaded"], 1)
+        self.assertEqual(report.total_bytes, SIZE)
+        out_file = Path(str(self.out_path) + ".zip")
+        self.assertEqual(out_file.read_bytes(), self.mock.product_bytes("uid"))
@@ -0,0 +1,84 @@
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+from ..benchmarks.mock_cdse import MockCDSE
+from ..copernicus_api import Sentinel2API
+from ..download_manager import DONE, IN_PROGRESS, QUEUED, DownloadManager
+
+SIZE = 256 * 1024
+
+
+class DownloadManagerTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        uids = [f"p{i}" for i in range(3)]
+        self.mock = MockCDSE(products=dict.fromkeys(uids, SIZE)).start()
+        self.addCleanup(self.mock.stop)
+        self.products = pd.DataFrame(
+            [{"Id": uid, "Name": uid, "ContentLength": SIZE} for uid in uids]
+        )
+
+    def manager(self, lease: float = 300) -> DownloadManager:
+        api = Sentinel2API(
+            "user",
+            "password",
+            token_url=self.mock.token_url,
+            download_url=self.mock.download_url,
+        )
+        return DownloadManager(
+            api, self.dir / "manifest.sqlite", self.dir / "out", lease=lease
+        )
+
+    def states(self, manager: DownloadManager) -> dict[str, str]:
+        entries = manager.entries()
+        return dict(zip(entries["id"], entries["state"]))
+
+    def test_drain(self):
+        manager = self.manager()
+        self.assertEqual(manager.enqueue(self.products), 3)
+        self.assertEqual(manager.drain(threads=2)[DONE], 3)
+        for uid in self.products["Id"]:
+            path = self.dir / "out" / f"{uid}.zip"
+            self.assertEqual(path.read_bytes(), self.mock.product_bytes(uid))
+
+    def test_products_of_running_workers_are_not_taken_over(self):
+        running = self.manager()
+        running.enqueue(self.products)
+        claimed = running._claim()["id"]
+        self.manager().drain(threads=2)
+        states = self.states(running)
+        self.assertEqual(states.pop(claimed), IN_PROGRESS)
+        self.assertEqual(set(states.values()), {DONE})
+
+    def test_expired_lease_is_recovered(self):
+        crashed = self.manager()
+        crashed.enqueue(self.products)
+        crashed._claim()
+        time.sleep(0.1)
+        self.assertEqual(self.manager(lease=0.05).drain()[DONE], 3)
+
+    def test_lease_is_renewed_while_downloading(self):
+        self.mock.bandwidth = SIZE  # one second per product
+        manager = self.manager(lease=0.3)
+        manager.enqueue(self.products.head(1))
+        drain = threading.Thread(target=manager.drain, kwargs={"threads": 1})
+        drain.start()
+        time.sleep(0.7)
+        self.assertEqual(manager.recover(lease=0.3), 0)
+        self.assertEqual(self.states(manager)["p0"], IN_PROGRESS)
+        drain.join()
+        self.assertEqual(self.states(manager)["p0"], DONE)
+
+    def test_recover_requeues_all_by_default(self):
+        manager = self.manager()
+        manager.enqueue(self.products)
+        manager._claim()
+        self.assertEqual(manager.recover(), 1)
+        self.assertEqual(set(self.states(manager).values()), {QUEUED})
@@ -0,0 +1,193 @@
+import io
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+from unittest import mock
+
+import requests
+
+from ..copernicus_api import Sentinel2API
+from ..exceptions import ExtractionError
+from ..extract import ZipStreamExtractor, extract_members, extract_stream
+
+# Data containing a data descriptor signature, a stored member must not end
+# at it
+TRICKY = b"head PK\x07\x08 not a descriptor " + bytes(range(256)) * 64
+
+MEMBERS = {
+    "S2A_MSIL2A.SAFE/MTD_MSIL2A.xml": b"<metadata/>" * 100,
+    "S2A_MSIL2A.SAFE/GRANULE/IMG_DATA/R10m/T34TEM_B04_10m.jp2": TRICKY,
+    "S2A_MSIL2A.SAFE/GRANULE/IMG_DATA/R10m/T34TEM_B08_10m.jp2": b"\x00" * 5000,
+    "S2A_MSIL2A.SAFE/GRANULE/IMG_DATA/R20m/T34TEM_B05_20m.jp2": b"",
+}
+
+
+class _Unseekable(io.RawIOBase):
+    """Write-only stream, makes zipfile write data descriptors"""
+
+    def __init__(self) -> None:
+        self.data = bytearray()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self.data += b
+        return len(b)
+
+
+def build_archive(
+    compression: int = zipfile.ZIP_DEFLATED,
+    descriptors: bool = False,
+    zip64: bool = False,
+) -> bytes:
+    out = _Unseekable() if descriptors else io.BytesIO()
+    with zipfile.ZipFile(out, "w", compression) as zf:
+        for name, data in MEMBERS.items():
+            with zf.open(name, "w", force_zip64=zip64) as member:
+                member.write(data)
+    return bytes(out.data) if descriptors else out.getvalue()
+
+
+def chunked(data: bytes, size: int) -> list[bytes]:
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+class _DroppingSession:
+    """Serves an archive, closing the first connection after `drop_at` bytes"""
+
+    def __init__(self, archive: bytes, drop_at: int) -> None:
+        self.archive = archive
+        self.drop_at = drop_at
+        self.ranges = []
+
+    def get(self, url, headers, stream):
+        requested = headers.get("Range")
+        self.ranges.append(requested)
+        start = int(requested[6:-1]) if requested else 0
+        response = mock.MagicMock(status_code=206 if requested else 200)
+        response.__enter__.return_value = response
+
+        def iter_content(chunk_size):
+            data = self.archive[start:]
+            for pos in range(0, len(data), 1000):
+                if len(self.ranges) == 1 and pos >= self.drop_at:
+                    raise requests.exceptions.ChunkedEncodingError("dropped")
+                yield data[pos : pos + 1000]
+
+        response.iter_content = iter_content
+        return response
+
+
+class ZipStreamExtractorTests(unittest.TestCase):
+    def assertExtracted(self, archive: bytes, chunk_size: int = 7, **kwargs) -> None:
+        extracted = extract_stream(chunked(archive, chunk_size), **kwargs)
+        self.assertEqual(
+            extracted,
+            {
+                name: data
+                for name, data in MEMBERS.items()
+                if name.endswith(("_B04_10m.jp2", "_B05_20m.jp2"))
+            },
+        )
+
+    def test_known_sizes(self):
+        for compression in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+            with self.subTest(compression=compression):
+                self.assertExtracted(build_archive(compression), bands=["B04", "B05"])
+
+    def test_data_descriptors(self):
+        for compression in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+            with self.subTest(compression=compression):
+                archive = build_archive(compression, descriptors=True)
+                self.assertExtracted(archive, bands=["B04", "B05"])
+
+    def test_unselected_stored_members_with_descriptor_are_skipped(self):
+        archive = build_archive(zipfile.ZIP_STORED, descriptors=True)
+        extracted = extract_stream(chunked(archive, 1000), patterns=["*.xml"])
+        self.assertEqual(list(extracted), ["S2A_MSIL2A.SAFE/MTD_MSIL2A.xml"])
+
+    def test_zip64(self):
+        for compression in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+            for descriptors in (False, True):
+                with self.subTest(compression=compression, descriptors=descriptors):
+                    archive = build_archive(compression, descriptors, zip64=True)
+                    self.assertExtracted(archive, bands=["B04", "B05"])
+
+    def test_resume_offset(self):
+        archive = build_archive(zipfile.ZIP_STORED, descriptors=True)
+        extractor = ZipStreamExtractor(bands=["B04", "B05"])
+        # First transfer interrupted part way through
+        for chunk in chunked(archive[: len(archive) // 2], 1000):
+            extractor.feed(chunk)
+        self.assertEqual(extractor.offset, len(archive) // 2)
+        # The resumed transfer starts at the offset
+        for chunk in chunked(archive[extractor.offset :], 1000):
+            extractor.feed(chunk)
+            if extractor.done:
+                break
+        self.assertTrue(extractor.done)
+        self.assertEqual(len(extractor.close()), 2)
+
+    def test_out_dir(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            extracted = extract_stream(
+                chunked(build_archive(), 100), tmp, bands=["B04"], flatten=True
+            )
+            path = Path(tmp) / "T34TEM_B04_10m.jp2"
+            self.assertEqual(list(extracted.values()), [path])
+            self.assertEqual(path.read_bytes(), TRICKY)
+            self.assertEqual([p.name for p in Path(tmp).iterdir()], [path.name])
+
+    def test_truncated_archive_leaves_no_outputs(self):
+        archive = build_archive(zipfile.ZIP_STORED, descriptors=True)
+        with tempfile.TemporaryDirectory() as tmp:
+            extractor = ZipStreamExtractor(tmp, bands=["B04", "B08"])
+            extractor.feed(archive[: len(archive) * 3 // 4])
+            with self.assertRaises(ExtractionError):
+                extractor.close()
+            self.assertEqual(list(Path(tmp).rglob("*.jp2*")), [])
+
+    def test_crc_mismatch(self):
+        archive = bytearray(build_archive(zipfile.ZIP_STORED))
+        pos = archive.index(b"not a descriptor")
+        archive[pos] ^= 0xFF
+        with self.assertRaises(ExtractionError):
+            extract_stream([bytes(archive)], bands=["B04"])
+
+
+class ExtractByIdTests(unittest.TestCase):
+    def test_resumes_interrupted_download(self):
+        archive = build_archive(zipfile.ZIP_STORED, descriptors=True)
+        api = Sentinel2API("user", "password", retries=1)
+        # Dropped in the middle of the selected stored member
+        api.session = _DroppingSession(archive, drop_at=12000)
+        with mock.patch.object(api, "_get_access_token", return_value="token"):
+            extracted = api.extract_by_id("uid", bands=["B04"])
+        self.assertEqual(api.session.ranges, [None, "bytes=12000-"])
+        self.assertEqual(list(extracted.values()), [TRICKY])
+
+
+class ExtractMembersTests(unittest.TestCase):
+    def test_patterns(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            archive = Path(tmp) / "product.zip"
+            archive.write_bytes(build_archive(zipfile.ZIP_DEFLATED, zip64=True))
+            extracted = extract_members(archive, patterns=["*/R10m/*.jp2"])
+        self.assertEqual(
+            sorted(extracted),
+            sorted(name for name in MEMBERS if "/R10m/" in name),
+        )
+        self.assertEqual(
+            extracted["S2A_MSIL2A.SAFE/GRANULE/IMG_DATA/R10m/T34TEM_B04_10m.jp2"],
+            TRICKY,
+        )
+
+    def test_unsafe_path(self):
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, "w") as zf:
+            zf.writestr("../escape.txt", b"x")
+        with tempfile.TemporaryDirectory() as tmp:
+            with self.assertRaises(ExtractionError):
+                extract_stream([buf.getvalue()], tmp)
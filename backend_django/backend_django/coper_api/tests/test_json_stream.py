@@ -0,0 +1,72 @@
+import json
+import unittest
+
+from ..json_stream import ODataStream
+
+PRODUCTS = [
+    {
+        "Id": "a1",
+        "Name": "S2A_MSIL2A_20240101T093401_N0510_R136_T34TEM.SAFE",
+        "Footprint": "geography'SRID=4326;POLYGON ((21 41, 22 41, 22 42, 21 41))'",
+        "Attributes": [{"Name": "cloudCover", "Value": 12.5}],
+    },
+    # Separators, brackets and multi-byte characters inside strings
+    {"Id": "b2", "Name": 'Škopje ], {"value": [ 日本', "Attributes": []},
+    {"Id": "c3", "Name": "", "Attributes": [{"Name": "tileId", "Value": "34TEM"}]},
+]
+METADATA = {
+    "@odata.context": "$metadata#Products",
+    "@odata.nextLink": "https://catalogue/odata/v1/Products?$skip=3",
+}
+# The products are not kept in the metadata
+STREAMED_METADATA = {**METADATA, "value": []}
+
+
+def body(products: list = PRODUCTS, indent: int | None = None) -> bytes:
+    response = {"@odata.context": METADATA["@odata.context"], "value": products}
+    response["@odata.nextLink"] = METADATA["@odata.nextLink"]
+    return json.dumps(response, indent=indent, ensure_ascii=False).encode()
+
+
+def chunked(data: bytes, size: int) -> list[bytes]:
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+class ODataStreamTests(unittest.TestCase):
+    def test_split_chunks(self):
+        for indent in (None, 2):
+            data = body(indent=indent)
+            for size in (1, 2, 3, 7, 64, len(data)):
+                with self.subTest(indent=indent, size=size):
+                    stream = ODataStream(chunked(data, size))
+                    self.assertEqual(list(stream), PRODUCTS)
+                    self.assertEqual(stream.metadata, STREAMED_METADATA)
+
+    def test_empty_value(self):
+        stream = ODataStream(chunked(body([]), 5))
+        self.assertEqual(list(stream), [])
+        self.assertEqual(stream.metadata, STREAMED_METADATA)
+
+    def test_response_without_value(self):
+        error = {"error": {"code": "400", "message": "Invalid filter"}}
+        stream = ODataStream(chunked(json.dumps(error).encode(), 4))
+        self.assertEqual(list(stream), [])
+        self.assertEqual(stream.metadata, error)
+
+    def test_truncated_response(self):
+        data = body()
+        stream = ODataStream(chunked(data[: len(data) // 2], 10))
+        with self.assertRaises(json.JSONDecodeError):
+            list(stream)
+
+    def test_products_are_yielded_while_receiving(self):
+        received = []
+
+        def chunks():
+            for chunk in chunked(body(), 16):
+                received.append(chunk)
+                yield chunk
+
+        stream = iter(ODataStream(chunks()))
+        self.assertEqual(next(stream), PRODUCTS[0])
+        self.assertLess(sum(map(len, received)), len(body()))
@@ -0,0 +1,42 @@
+import unittest
+
+from ..benchmarks.mock_cdse import MockCDSE, synthetic_catalog
+from ..copernicus_api import Sentinel2API
+
+WINDOW = {"start_time": "2024-01-01", "end_time": "2024-02-01"}
+
+
+class QueryLimitTests(unittest.TestCase):
+    def setUp(self):
+        self.catalog = synthetic_catalog("SENTINEL-2", 2000)
+        self.mock = MockCDSE(catalog=self.catalog).start()
+        self.addCleanup(self.mock.stop)
+        self.api = Sentinel2API(
+            "user",
+            "password",
+            token_url=self.mock.token_url,
+            catalog_url=self.mock.catalog_url,
+        )
+
+    def test_limit(self):
+        for next_links in (True, False):
+            for stream in (False, True):
+                with self.subTest(next_links=next_links, stream=stream):
+                    self.mock.next_links = next_links
+                    self.mock.stats.clear()
+                    products = self.api.query(
+                        **WINDOW, limit=1200, orderby="asc", stream=stream
+                    )
+                    self.assertEqual(len(products), 1200)
+                    self.assertEqual(products["Id"].is_unique, True)
+                    self.assertEqual(self.mock.stats["catalog"], 2)
+
+    def test_limit_within_a_stream_chunk(self):
+        products = self.api.query(**WINDOW, limit=7, stream=True, chunk_rows=5)
+        self.assertEqual(len(products), 7)
+
+    def test_no_limit(self):
+        for stream in (False, True):
+            with self.subTest(stream=stream):
+                products = self.api.query(**WINDOW, stream=stream)
+                self.assertEqual(len(products), len(self.catalog))
@@ -0,0 +1,48 @@
+import unittest
+
+from ..benchmarks.mock_cdse import MockCDSE, synthetic_catalog
+from ..copernicus_api import Sentinel2API
+
+WINDOW = {"start_time": "2024-01-01", "end_time": "2024-02-01"}
+
+
+class SharedPoolTests(unittest.TestCase):
+    def setUp(self):
+        self.api = Sentinel2API("user", "password")
+
+    @staticmethod
+    def adapter_size(api: Sentinel2API) -> int:
+        """Pool size actually mounted on the session"""
+        adapter = api.session.get_adapter("https://")
+        return adapter.poolmanager.connection_pool_kw["maxsize"]
+
+    def test_pool_only_grows(self):
+        self.api._resize_pool(24)
+        self.api._resize_pool(8)
+        self.assertEqual(self.api.pool_size, 24)
+        self.assertEqual(self.adapter_size(self.api), 24)
+
+    def test_mission_clients_share_the_pool(self):
+        clone = self.api.for_mission("SENTINEL-1")
+        self.api._resize_pool(24)
+        clone._resize_pool(8)
+        self.assertIs(clone.session, self.api.session)
+        self.assertEqual(clone.pool_size, 24)
+        self.assertEqual(self.adapter_size(self.api), 24)
+
+    def test_query_missions_keeps_the_grown_pool(self):
+        catalog = synthetic_catalog("SENTINEL-2", 50)
+        with MockCDSE(catalog=catalog) as mock:
+            api = Sentinel2API(
+                "user",
+                "password",
+                token_url=mock.token_url,
+                catalog_url=mock.catalog_url,
+            )
+            api.query_missions(
+                ["SENTINEL-1", "SENTINEL-2", "SENTINEL-3"],
+                **WINDOW,
+                split="week",
+                split_workers=8,
+            )
+        self.assertEqual(self.adapter_size(api), 24)
@@ -154,6 +154,24 @@ CORS_ALLOWED_ORIGINS = [
 # Copernicus API Settings
 COPERNICUS_API_URL = 'https://ads.atmosphere.copernicus.eu/api'
 COPERNICUS_API_KEY = os.getenv('COPERNICUS_API_KEY', '')  # Set this in environment variables
+# Datasets retrieved concurrently per location, shared by all requests
+COPERNICUS_MAX_WORKERS = int(os.getenv('COPERNICUS_MAX_WORKERS', 4))
+# Seconds to wait for each dataset before falling back to default values
+COPERNICUS_DATASET_TIMEOUTS = {
+    'climate': 600,
+    'air_quality': 600,
+    'vegetation': 600,
+    'solar': 600,
+}
+# Persistent cache of CDS retrievals, reused for the same request until expired
+COPERNICUS_CACHE_DIR = os.getenv('COPERNICUS_CACHE_DIR', os.path.join(BASE_DIR, 'copernicus_cache'))
+COPERNICUS_CACHE_TTL = 3600  # seconds
+COPERNICUS_CACHE_MAX_BYTES = 2 * 1024 ** 3
+# Locations are retrieved in fixed regions of this many degrees, snapped to
+# each dataset's native grid
+COPERNICUS_REGION_SIZE = 5.0
+# Retrieved NetCDF files above this size are processed in dask chunks
+COPERNICUS_CHUNK_THRESHOLD = 64 * 1024 ** 2
 
 # Cache settings for Copernicus data
 CACHES = {
@@ -170,4 +188,9 @@ CACHES = {
 # Temporary file settings
 TEMP_DIR = os.path.join(BASE_DIR, 'temp')
 if not os.path.exists(TEMP_DIR):
-    os.makedirs(TEMP_DIR)
\ No newline at end of file
+    os.makedirs(TEMP_DIR)
+# Copernicus Data Space Ecosystem settings (Sentinel product downloads)
+CDSE_USERNAME = os.getenv('CDSE_USERNAME', '')
+CDSE_PASSWORD = os.getenv('CDSE_PASSWORD', '')
+CDSE_DOWNLOAD_DIR = os.getenv('CDSE_DOWNLOAD_DIR', os.path.join(BASE_DIR, 'sentinel_products'))
+CDSE_MANIFEST = os.path.join(CDSE_DOWNLOAD_DIR, 'manifest.sqlite3')